@@ -36,6 +36,7 @@ from database.operations import (
     is_device_already_used_in_session, is_student_in_class,
     is_student_already_checked_in_session, is_device_already_checked_in_session
 )
+from database.connection import get_db_connection, pooled_connection
 from services.fingerprint import generate_comprehensive_fingerprint, create_fingerprint_hash
 from services.attendance import store_device_fingerprint
 from services.token import generate_token, validate_token_access
@@ -284,14 +285,10 @@ def checkin():
         # --- ENFORCE DEVICE MATCH: Only allow check-in from device that opened the QR code ---
         token_device_fingerprint_id = token_data.get('device_fingerprint_id')
         if token_device_fingerprint_id:
-            import sqlite3
-            from config.config import Config
-            conn = sqlite3.connect(Config.DATABASE_PATH)
-            cursor = conn.cursor()
             # Get the fingerprint_hash for the device that opened the QR
-            cursor.execute('SELECT fingerprint_hash FROM device_fingerprints WHERE id = ?', (token_device_fingerprint_id,))
-            row = cursor.fetchone()
-            conn.close()
+            with pooled_connection(readonly=True) as conn:
+                row = conn.execute('SELECT fingerprint_hash FROM device_fingerprints WHERE id = ?',
+                                   (token_device_fingerprint_id,)).fetchone()
             token_fingerprint_hash = row[0] if row else None
             # Generate the current fingerprint hash using visitor_id and user_agent
             from services.fingerprint import create_fingerprint_hash
@@ -350,10 +347,9 @@ def checkin():
 
         # Store device info (minimal) and record attendance in the same transaction
         print("Storing device info and recording attendance in a single transaction...")
-        import sqlite3
-        from config.config import Config  # <-- FIX: import Config here
         from datetime import datetime, timedelta
-        conn = sqlite3.connect(Config.DATABASE_PATH)
+        # Configured (WAL, synchronous=NORMAL, foreign keys) per-thread connection
+        conn = get_db_connection()
         cursor = conn.cursor()
         try:
             # Check device limits INSIDE the transaction to prevent race conditions
@@ -387,7 +383,6 @@ def checkin():
             print("Device allowed - per-session check passed")
             # Store or update device fingerprint
             import json
-            current_time = datetime.utcnow().isoformat()
             # Use only the minimal device info sent by frontend
             minimal_device_info = {
                 'visitor_id': visitor_id,
@@ -400,17 +395,19 @@ def checkin():
             row = cursor.fetchone()
             if row:
                 device_fingerprint_id = row[0]
+                # Seen times are stamped by SQLite, in UTC
                 cursor.execute('''
                     UPDATE device_fingerprints 
-                    SET last_seen = ?, usage_count = usage_count + 1, device_info = ?, updated_at = ?
+                    SET last_seen = strftime('%Y-%m-%dT%H:%M:%f', 'now'), usage_count = usage_count + 1, device_info = ?,
+                        updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')
                     WHERE id = ?
-                ''', (current_time, device_info_str, current_time, device_fingerprint_id))
+                ''', (device_info_str, device_fingerprint_id))
             else:
                 cursor.execute('''
                     INSERT INTO device_fingerprints 
-                    (fingerprint_hash, first_seen, last_seen, usage_count, device_info, created_at, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (fingerprint_hash, current_time, current_time, 1, device_info_str, current_time, current_time))
+                    (fingerprint_hash, first_seen, last_seen, usage_count, device_info, updated_at)
+                    VALUES (?, strftime('%Y-%m-%dT%H:%M:%f', 'now'), strftime('%Y-%m-%dT%H:%M:%f', 'now'), 1, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+                ''', (fingerprint_hash, device_info_str))
                 device_fingerprint_id = cursor.lastrowid
             print(f"[DEBUG] (TX) device_fingerprint_id={device_fingerprint_id}")
             # Mark token as used
@@ -493,7 +490,10 @@ def delete_all_data():
     """Delete all attendance, denied attempts, and device fingerprint data"""
     try:
         from database.connection import get_db_connection
+        from database.operations import flush_denied_attempts
         
+        # Write queued denied attempts first so the clear below includes them
+        flush_denied_attempts()
         conn = get_db_connection()
         cursor = conn.cursor()
         
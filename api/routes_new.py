@@ -17,6 +17,7 @@ and separation of concerns.
 """
 
 from flask import Blueprint
+from database.connection import release_thread_connections
 
 # Import all route blueprints
 from .core_routes import core_bp
@@ -49,6 +50,12 @@ def register_routes(app):
     # Register the main API blueprint (for any remaining routes)
     app.register_blueprint(api_bp)
     
+    # get_db_connection() caches one connection per thread; make sure no request
+    # leaves a transaction open on it (e.g. an exception before conn.close())
+    @app.teardown_request
+    def reset_db_connections(exc=None):
+        release_thread_connections()
+    
     print("All route blueprints registered successfully")
 
 # Re-export the main blueprint for backward compatibility
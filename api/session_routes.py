@@ -206,6 +206,10 @@ def delete_session_profile(profile_id):
         affected_rows = cursor.rowcount
         conn.close()
         
+        # The profile's sessions were removed by ON DELETE CASCADE
+        from database.operations import invalidate_active_session_cache
+        invalidate_active_session_cache()
+        
         if affected_rows > 0:
             return jsonify({'status': 'success', 'message': 'Profile deleted successfully'})
         else:
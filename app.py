@@ -45,7 +45,7 @@ Dependencies: Flask, database modules, network utilities, API blueprints
 
 from flask import Flask, render_template, request, jsonify, redirect, url_for
 from flask import current_app as app
-from database import init_db, migrate_database
+from database import init_db
 from utils.network import get_all_network_interfaces
 from sqlalchemy import Table, Column, Integer, String, MetaData
 from sqlalchemy.exc import SQLAlchemyError
@@ -205,8 +205,8 @@ if __name__ == '__main__':
         migration_info = get_migration_info()
         print(f"📁 User data location: {migration_info['user_data_dir']}")
         
+        # init_db runs the full migrate_tables pass (fresh install or upgrade); no second pass needed
         init_db()
-        migrate_database()
         create_optimized_classes_schema()
         
         interfaces = get_all_network_interfaces()
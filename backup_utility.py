@@ -13,7 +13,6 @@ Usage:
 
 import os
 import sys
-import shutil
 import json
 from datetime import datetime
 import argparse
@@ -23,6 +22,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from config.config import Config
 from database.user_data_migration import UserDataMigration
+from database.connection import backup_database_file, restore_database_file
 
 
 def create_manual_backup():
@@ -45,7 +45,7 @@ def create_manual_backup():
         if os.path.exists(attendance_db):
             filename = os.path.basename(attendance_db)
             backup_file = os.path.join(backup_path, filename)
-            shutil.copy2(attendance_db, backup_file)
+            backup_database_file(attendance_db, backup_file)
             backed_up_files.append(filename)
             total_size += os.path.getsize(backup_file)
             print(f"✓ Backed up: {filename}")
@@ -55,7 +55,7 @@ def create_manual_backup():
         if os.path.exists(classes_db):
             filename = os.path.basename(classes_db)
             backup_file = os.path.join(backup_path, filename)
-            shutil.copy2(classes_db, backup_file)
+            backup_database_file(classes_db, backup_file)
             backed_up_files.append(filename)
             total_size += os.path.getsize(backup_file)
             print(f"✓ Backed up: {filename}")
@@ -198,7 +198,8 @@ def restore_from_backup():
                 continue
             
             if os.path.exists(source_file):
-                shutil.copy2(source_file, dest_file)
+                # Through SQLite, so a running server's -wal file is not replayed over the restore
+                restore_database_file(source_file, dest_file)
                 restored_files.append(filename)
                 print(f"✓ Restored: {filename}")
         
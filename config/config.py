@@ -28,6 +28,7 @@ Security Settings:
 - TOKEN_LENGTH: QR code token character length for security
 - TOKEN_EXPIRY: Token validity duration in seconds
 - RATE_LIMIT_*: Request throttling to prevent abuse
+- DB_READ_POOL_SIZE: Pooled read-only SQLite connections per database file
 
 Device Policy Settings:
 - max_uses_per_device: [DEPRECATED] Previously used for time-window limits, now unused
@@ -92,6 +93,9 @@ class Config:
     TOKEN_LENGTH = 16
     TOKEN_EXPIRY = 3600  # 1 hour
     
+    # Connection pooling (read-only connections kept per database file; writes share one connection)
+    DB_READ_POOL_SIZE = int(os.environ.get('DB_READ_POOL_SIZE', 5))
+    
     @classmethod
     def ensure_database_directory(cls):
         """Ensure the database directory exists"""
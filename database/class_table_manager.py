@@ -1,6 +1,45 @@
 import sqlite3
 import os
+import re
+import json
+import logging
+import functools
+import operator
 from config.config import Config
+from database.connection import acquire_connection, release_connection
+
+log = logging.getLogger(__name__)
+
+# INSERT ... RETURNING needs SQLite 3.35+; older libraries look the class ID up afterwards
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Class table identifiers: spaces/dashes become underscores, anything else non-alphanumeric is dropped
+_SPACE_DASH_TO_UNDERSCORE = str.maketrans(' -', '__')
+_NON_IDENTIFIER_RE = re.compile(r'[^\w]')
+
+def _sanitize_class_table(name):
+    """Turn a class/course name into a class_table identifier"""
+    return _NON_IDENTIFIER_RE.sub('', name.translate(_SPACE_DASH_TO_UNDERSCORE))
+
+def _row_packer(*keys):
+    """Build a fast dict -> tuple packer for the given keys; missing keys become ''"""
+    getter = operator.itemgetter(*keys)
+    
+    def pack(student):
+        try:
+            return getter(student)
+        except KeyError:
+            return tuple(student.get(key, '') for key in keys)
+    return pack
+
+# Uploaded student dicts -> (studentId, studentName, course, yearLevel)
+_student_row = _row_packer('studentId', 'studentName', 'course', 'yearLevel')
+# Uploaded student dicts -> class table column order
+_class_row = _row_packer('studentId', 'studentName', 'yearLevel', 'course')
+
+def _get_conn(db_path, mode='rw'):
+    """Borrow a pooled connection: 'ro' shares the read-only pool, 'rw' the single writer"""
+    return acquire_connection(db_path, readonly=(mode == 'ro'))
 
 def convert_year_to_integer(year_level):
     """Convert year level to integer for database storage"""
@@ -22,13 +61,12 @@ def convert_year_to_integer(year_level):
         return 5
     
     # Try to extract any number from the string
-    import re
     match = re.search(r'(\d+)', year_str)
     if match:
         return int(match.group(1))
     
     # Default to 1 if no valid year found
-    print(f"Warning: Unable to parse year level: {year_level}, defaulting to 1")
+    log.warning("Unable to parse year level: %s, defaulting to 1", year_level)
     return 1
 
 def add_students_to_class(class_name, students, db_path=None):
@@ -41,43 +79,43 @@ def add_students_to_class(class_name, students, db_path=None):
     if db_path is None:
         db_path = Config.DATABASE_PATH
     # Sanitize class name
-    class_table = class_name.replace(' ', '_').replace('-', '_')
-    class_table = ''.join(c for c in class_table if c.isalnum() or c == '_')
-    
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    class_table = _sanitize_class_table(class_name)
     
+    conn = None
     try:
-        for student in students:
-            # Convert year level safely
-            year_level_raw = student.get('yearLevel', '')
-            year_level_int = convert_year_to_integer(year_level_raw) if year_level_raw else 1
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO students (student_id, name, course, year, created_at, updated_at)
-                VALUES (?, ?, ?, ?, datetime('now'), datetime('now'))
-            ''', (
-                student.get('studentId', ''),
-                student.get('studentName', ''),
-                student.get('course', ''),
-                year_level_int
-            ))
-            
-            # Initialize student attendance summary
-            cursor.execute('''
-                INSERT OR IGNORE INTO student_attendance_summary 
-                (student_id, total_sessions, present_count, absent_count, status, updated_at)
-                VALUES (?, 0, 0, 0, 'active', datetime('now'))
-            ''', (student.get('studentId', ''),))
+        conn = _get_conn(db_path, 'rw')
+        cursor = conn.cursor()
+        
+        # Single pass over the upload: pack each dict and convert the year level safely
+        rows = [
+            (student_id, name, course, convert_year_to_integer(year_level_raw) if year_level_raw else 1)
+            for student_id, name, course, year_level_raw in map(_student_row, students)
+        ]
+        
+        cursor.executemany('''
+            INSERT INTO students (student_id, name, course, year, created_at, updated_at)
+            VALUES (?, ?, ?, ?, datetime('now'), datetime('now'))
+            ON CONFLICT(student_id) DO UPDATE SET
+                name = excluded.name, course = excluded.course,
+                year = excluded.year, updated_at = excluded.updated_at
+        ''', rows)
+        
+        # Initialize student attendance summaries
+        cursor.executemany('''
+            INSERT OR IGNORE INTO student_attendance_summary
+            (student_id, total_sessions, present_count, absent_count, status, updated_at)
+            VALUES (?, 0, 0, 0, 'active', datetime('now'))
+        ''', (row[:1] for row in rows))
         
         conn.commit()
-        print(f"Successfully added {len(students)} students to class '{class_name}' (table: {class_table})")
+        log.info("Added %d students to class %r (table: %s)", len(students), class_name, class_table)
         
     except Exception as e:
-        print(f"Error adding students to class: {e}")
-        conn.rollback()
+        log.error("Error adding students to class: %s", e)
+        if conn:
+            conn.rollback()
     finally:
-        conn.close()
+        release_connection(conn)
 
 def get_students_by_class(class_table, db_path='attendance.db'):
     """
@@ -86,10 +124,11 @@ def get_students_by_class(class_table, db_path='attendance.db'):
     :param db_path: Path to the attendance database file
     :return: List of student dictionaries
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
+    conn = None
     try:
+        conn = _get_conn(db_path, 'ro')
+        cursor = conn.cursor()
+        
         cursor.execute('''
             SELECT 
                 s.student_id, 
@@ -108,15 +147,15 @@ def get_students_by_class(class_table, db_path='attendance.db'):
         ''')
         
         columns = [desc[0] for desc in cursor.description]
-        students = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        students = [dict(zip(columns, row)) for row in cursor]
         
         return students
         
     except Exception as e:
-        print(f"Error getting students for class {class_table}: {e}")
+        log.error("Error getting students for class %s: %s", class_table, e)
         return []
     finally:
-        conn.close()
+        release_connection(conn)
 
 def get_all_classes(db_path='attendance.db'):
     """
@@ -125,10 +164,11 @@ def get_all_classes(db_path='attendance.db'):
     :param db_path: Path to the attendance database file
     :return: List of class dictionaries with course name and student count
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
+    conn = None
     try:
+        conn = _get_conn(db_path, 'ro')
+        cursor = conn.cursor()
+        
         cursor.execute('''
             SELECT course, COUNT(*) as student_count
             FROM students 
@@ -138,11 +178,11 @@ def get_all_classes(db_path='attendance.db'):
         ''')
         
         classes = []
-        for row in cursor.fetchall():
+        for row in cursor:
             course, student_count = row
             # Use course as both display name and identifier
             classes.append({
-                'table_name': course.replace(' ', '_').replace('-', '_'),
+                'table_name': course.translate(_SPACE_DASH_TO_UNDERSCORE),
                 'display_name': course,
                 'student_count': student_count
             })
@@ -150,10 +190,10 @@ def get_all_classes(db_path='attendance.db'):
         return classes
         
     except Exception as e:
-        print(f"Error getting class list: {e}")
+        log.error("Error getting class list: %s", e)
         return []
     finally:
-        conn.close()
+        release_connection(conn)
 
 def delete_class(course_name, db_path='attendance.db'):
     """
@@ -162,10 +202,11 @@ def delete_class(course_name, db_path='attendance.db'):
     :param db_path: Path to the attendance database file
     :return: Number of students deleted
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
+    conn = None
     try:
+        conn = _get_conn(db_path, 'rw')
+        cursor = conn.cursor()
+        
         # First get student IDs to clean up their attendance summaries
         cursor.execute('SELECT student_id FROM students WHERE course = ?', (course_name,))
         student_ids = [row[0] for row in cursor.fetchall()]
@@ -179,14 +220,38 @@ def delete_class(course_name, db_path='attendance.db'):
         deleted_count = cursor.rowcount
         conn.commit()
         
-        print(f"Deleted {deleted_count} students from course '{course_name}'")
+        log.info("Deleted %d students from course %r", deleted_count, course_name)
         return deleted_count
         
     except Exception as e:
-        print(f"Error deleting course {course_name}: {e}")
+        log.error("Error deleting course %s: %s", course_name, e)
         return 0
     finally:
-        conn.close()
+        release_connection(conn)
+
+# Databases already seen with the normalized tables; only a positive result is remembered,
+# so a database checked before migrate_tables/create_all_tables ran is re-checked next time
+_normalized_schema_paths = set()
+
+def _schema_is_normalized(db_path):
+    """sqlite_master check behind check_normalized_schema (errors and negative results are not cached)"""
+    if db_path in _normalized_schema_paths:
+        return True
+    
+    conn = _get_conn(db_path, 'ro')
+    try:
+        # All three new tables should exist
+        (table_count,) = conn.execute("""
+            SELECT COUNT(*) FROM sqlite_master 
+            WHERE type='table' AND name IN ('class_attendees', 'student_attendance_summary', 'device_fingerprints')
+        """).fetchone()
+    finally:
+        release_connection(conn)
+    
+    if table_count >= 3:
+        _normalized_schema_paths.add(db_path)
+        return True
+    return False
 
 def check_normalized_schema(db_path='attendance.db'):
     """
@@ -194,24 +259,12 @@ def check_normalized_schema(db_path='attendance.db'):
     :param db_path: Path to the attendance database file
     :return: True if normalized schema exists, False otherwise
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
     try:
-        # Check if new tables exist
-        cursor.execute("""
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name IN ('class_attendees', 'student_attendance_summary', 'device_fingerprints')
-        """)
-        new_tables = cursor.fetchall()
-        
-        return len(new_tables) >= 3  # All three new tables should exist
+        return _schema_is_normalized(db_path)
         
     except sqlite3.Error as e:
-        print(f"Error checking schema: {e}")
+        log.error("Error checking schema: %s", e)
         return False
-    finally:
-        conn.close()
 
 def migrate_to_normalized_schema(db_path='attendance.db'):
     """
@@ -245,11 +298,23 @@ def get_students_by_course(course_name, db_path='attendance.db'):
     :param db_path: Path to the attendance database file
     :return: List of student dictionaries
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
     try:
-        cursor.execute('''
+        return list(iter_students_by_course(course_name, db_path))
+        
+    except Exception as e:
+        log.error("Error getting students for course %s: %s", course_name, e)
+        return []
+
+def iter_students_by_course(course_name, db_path='attendance.db'):
+    """
+    Yield student dictionaries for a course one row at a time (same shape as
+    get_students_by_course) so large rosters can be streamed.
+    :param course_name: The course name
+    :param db_path: Path to the attendance database file
+    """
+    conn = _get_conn(db_path, 'ro')
+    try:
+        cursor = conn.execute('''
             SELECT 
                 s.student_id, 
                 s.name, 
@@ -268,15 +333,10 @@ def get_students_by_course(course_name, db_path='attendance.db'):
         ''', (course_name,))
         
         columns = [desc[0] for desc in cursor.description]
-        students = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        
-        return students
-        
-    except Exception as e:
-        print(f"Error getting students for course {course_name}: {e}")
-        return []
+        for row in cursor:
+            yield dict(zip(columns, row))
     finally:
-        conn.close()
+        release_connection(conn)
 
 def get_session_attendance_for_course(course_name, session_id, db_path='attendance.db'):
     """
@@ -286,10 +346,11 @@ def get_session_attendance_for_course(course_name, session_id, db_path='attendan
     :param db_path: Path to the attendance database file
     :return: Dictionary with attendance statistics
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
+    conn = None
     try:
+        conn = _get_conn(db_path, 'ro')
+        cursor = conn.cursor()
+        
         # Get total students in course
         cursor.execute('SELECT COUNT(*) FROM students WHERE course = ?', (course_name,))
         total_students = cursor.fetchone()[0]
@@ -314,61 +375,63 @@ def get_session_attendance_for_course(course_name, session_id, db_path='attendan
         }
         
     except Exception as e:
-        print(f"Error getting session attendance for course {course_name}: {e}")
+        log.error("Error getting session attendance for course %s: %s", course_name, e)
         return {}
     finally:
-        conn.close()
+        release_connection(conn)
+
+@functools.lru_cache(maxsize=32)
+def _compile_insert(table_name):
+    """Build (sql, row_fn) once per class table for insert_students"""
+    sql = (f'INSERT OR REPLACE INTO "{table_name}" (student_id, student_name, year_level, course) '
+           'VALUES (?, ?, ?, ?)')
+    return sql, _class_row
 
 # Legacy functions for backward compatibility (now redirect to new functions)
 def create_class_table(table_name, columns, db_path=None):
     """Create a table for a specific class in classes.db"""
     if db_path is None:
         db_path = Config.CLASSES_DATABASE_PATH
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
+    conn = None
     try:
+        conn = _get_conn(db_path, 'rw')
+        cursor = conn.cursor()
+        
         # Create table with specified columns
         column_definitions = ', '.join([f'{name} {type_}' for name, type_ in columns])
         create_table_sql = f'CREATE TABLE IF NOT EXISTS "{table_name}" ({column_definitions})'
         
         cursor.execute(create_table_sql)
         conn.commit()
-        print(f"Created/verified table '{table_name}' in {db_path}")
+        log.info("Created/verified table %r in %s", table_name, db_path)
         
     except Exception as e:
-        print(f"Error creating table {table_name}: {e}")
+        log.error("Error creating table %s: %s", table_name, e)
     finally:
-        conn.close()
+        release_connection(conn)
 
 def insert_students(table_name, students, db_path=None):
     """Insert students into a specific class table in classes.db"""
     if db_path is None:
         db_path = Config.CLASSES_DATABASE_PATH
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
+    conn = None
     try:
+        conn = _get_conn(db_path, 'rw')
+        cursor = conn.cursor()
+        
         # Insert students into the class table
-        for student in students:
-            cursor.execute(f'''
-                INSERT OR REPLACE INTO "{table_name}" (student_id, student_name, year_level, course)
-                VALUES (?, ?, ?, ?)
-            ''', (
-                student.get('studentId', ''),
-                student.get('studentName', ''),
-                student.get('yearLevel', ''),
-                student.get('course', '')
-            ))
+        sql, row_fn = _compile_insert(table_name)
+        cursor.executemany(sql, map(row_fn, students))
         
         conn.commit()
-        print(f"Successfully added {len(students)} students to class table '{table_name}' in {db_path}")
+        log.info("Added %d students to class table %r in %s", len(students), table_name, db_path)
         
     except Exception as e:
-        print(f"Error inserting students into table {table_name}: {e}")
-        conn.rollback()
+        log.error("Error inserting students into table %s: %s", table_name, e)
+        if conn:
+            conn.rollback()
     finally:
-        conn.close()
+        release_connection(conn)
 
 if __name__ == "__main__":
     # Check database schema compatibility
@@ -380,6 +443,9 @@ if __name__ == "__main__":
 # TO ELIMINATE DATA REDUNDANCY AND IMPROVE PERFORMANCE
 # ===================================================================
 
+# classes_db_path -> {(class_name, professor_name): class_id}; dropped whenever this process creates/deletes a class
+_class_id_cache = {}
+
 class OptimizedClassManager:
     """Manages classes using the optimized normalized schema instead of table-per-class approach"""
     
@@ -388,17 +454,14 @@ class OptimizedClassManager:
         self.attendance_db_path = attendance_db_path or Config.DATABASE_PATH
         
         # Debug path information
-        print(f"🔍 OptimizedClassManager initialized:")
-        print(f"   Classes DB: {self.classes_db_path}")
-        print(f"   Attendance DB: {self.attendance_db_path}")
-        print(f"   Classes DB exists: {os.path.exists(self.classes_db_path)}")
-        print(f"   Attendance DB exists: {os.path.exists(self.attendance_db_path)}")
+        log.debug("OptimizedClassManager initialized: classes_db=%s attendance_db=%s",
+                  self.classes_db_path, self.attendance_db_path)
         
         # Ensure database directories exist
         for db_path in [self.classes_db_path, self.attendance_db_path]:
             db_dir = os.path.dirname(db_path)
             if not os.path.exists(db_dir):
-                print(f"   Creating directory: {db_dir}")
+                log.info("Creating directory: %s", db_dir)
                 os.makedirs(db_dir, exist_ok=True)
         
         # Verify and create optimized schema if needed
@@ -406,31 +469,28 @@ class OptimizedClassManager:
     
     def _ensure_optimized_schema(self):
         """Ensure the optimized classes schema exists, create if it doesn't"""
-        import sqlite3
-        
         try:
-            conn = sqlite3.connect(self.classes_db_path)
-            cursor = conn.cursor()
-            
-            # Check if the classes table exists
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='classes'")
-            classes_table_exists = cursor.fetchone() is not None
-            
-            conn.close()
+            conn = _get_conn(self.classes_db_path, 'rw')
+            try:
+                # Check if the classes table exists
+                cursor = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='classes'")
+                classes_table_exists = cursor.fetchone() is not None
+            finally:
+                release_connection(conn)
             
             if not classes_table_exists:
-                print("🔧 Optimized classes schema not found, creating it...")
+                log.info("Optimized classes schema not found, creating it...")
                 from database.models import create_optimized_classes_schema
                 if create_optimized_classes_schema(self.classes_db_path):
-                    print("✅ Optimized classes schema created successfully")
+                    log.info("Optimized classes schema created successfully")
                 else:
-                    print("❌ Failed to create optimized classes schema")
+                    log.error("Failed to create optimized classes schema")
                     raise Exception("Failed to create optimized classes schema")
             else:
-                print("✅ Optimized classes schema verified")
+                log.debug("Optimized classes schema verified")
                 
         except Exception as e:
-            print(f"❌ Error verifying optimized schema: {e}")
+            log.error("Error verifying optimized schema: %s", e)
             raise
     
     def create_class(self, class_name, professor_name, course_code=None, 
@@ -439,20 +499,14 @@ class OptimizedClassManager:
         Create a new class with professor information
         Returns the class ID
         """
-        import sqlite3
-        
         try:
-            print(f"🔧 Attempting to create class: {class_name}")
-            print(f"   Professor: {professor_name}")
-            print(f"   Database path: {self.classes_db_path}")
+            log.debug("Creating class %r (professor: %s) in %s", class_name, professor_name, self.classes_db_path)
             
-            conn = sqlite3.connect(self.classes_db_path)
+            conn = _get_conn(self.classes_db_path, 'rw')
             cursor = conn.cursor()
         except Exception as e:
-            print(f"❌ Failed to connect to classes database: {e}")
-            print(f"   Database path: {self.classes_db_path}")
-            print(f"   Path exists: {os.path.exists(self.classes_db_path)}")
-            print(f"   Directory exists: {os.path.exists(os.path.dirname(self.classes_db_path))}")
+            log.error("Failed to connect to classes database %s (exists: %s): %s",
+                      self.classes_db_path, os.path.exists(self.classes_db_path), e)
             return None
         
         try:
@@ -468,157 +522,184 @@ class OptimizedClassManager:
                 VALUES (?, 'active')
             """, (professor_name,))
             
-            # Insert class
-            cursor.execute("""
-                INSERT INTO classes 
-                (class_name, professor_name, course_code, semester, academic_year, status)
-                VALUES (?, ?, ?, ?, ?, 'active')
-            """, (class_name, professor_name, course_code, semester, academic_year))
-            
-            class_id = cursor.lastrowid
+            if _HAS_RETURNING:
+                # Insert class, or get the existing class's ID in the same statement
+                # (the no-op update leaves an existing row unchanged but lets RETURNING report it)
+                cursor.execute("""
+                    INSERT INTO classes 
+                    (class_name, professor_name, course_code, semester, academic_year, status)
+                    VALUES (?, ?, ?, ?, ?, 'active')
+                    ON CONFLICT(class_name, professor_name, semester, academic_year)
+                    DO UPDATE SET updated_at = classes.updated_at
+                    RETURNING id
+                """, (class_name, professor_name, course_code, semester, academic_year))
+                
+                class_id = cursor.fetchone()[0]
+            else:
+                # Insert class if not exists, then read the existing row's ID by its unique key
+                cursor.execute("""
+                    INSERT OR IGNORE INTO classes 
+                    (class_name, professor_name, course_code, semester, academic_year, status)
+                    VALUES (?, ?, ?, ?, ?, 'active')
+                """, (class_name, professor_name, course_code, semester, academic_year))
+                
+                if cursor.rowcount:
+                    class_id = cursor.lastrowid
+                else:
+                    cursor.execute("""
+                        SELECT id FROM classes
+                        WHERE class_name = ? AND professor_name = ? AND semester = ? AND academic_year = ?
+                    """, (class_name, professor_name, semester, academic_year))
+                    class_id = cursor.fetchone()[0]
             conn.commit()
+            _class_id_cache.pop(self.classes_db_path, None)
             
-            print(f"✅ Created class: {class_name} - {professor_name} (ID: {class_id})")
+            log.info("Created/found class: %s - %s (ID: %s)", class_name, professor_name, class_id)
             return class_id
             
-        except sqlite3.IntegrityError:
-            # Class already exists, get existing ID
-            cursor.execute("""
-                SELECT id FROM classes 
-                WHERE class_name = ? AND professor_name = ? AND semester = ? AND academic_year = ?
-            """, (class_name, professor_name, semester, academic_year))
-            result = cursor.fetchone()
-            return result[0] if result else None
         except Exception as e:
-            print(f"❌ Error creating class: {e}")
+            log.error("Error creating class: %s", e)
             conn.rollback()
             return None
         finally:
-            conn.close()
+            release_connection(conn)
     
     def enroll_students(self, class_id, student_ids):
         """
         Enroll multiple students in a class
         Returns number of students successfully enrolled
         """
-        import sqlite3
-        conn = sqlite3.connect(self.classes_db_path)
-        cursor = conn.cursor()
-        
-        enrolled_count = 0
+        conn = None
         try:
-            for student_id in student_ids:
-                try:
-                    cursor.execute("""
-                        INSERT OR IGNORE INTO class_enrollments 
-                        (class_id, student_id, enrollment_status)
-                        VALUES (?, ?, 'enrolled')
-                    """, (class_id, student_id))
-                    
-                    if cursor.rowcount > 0:
-                        enrolled_count += 1
-                        
-                except Exception as e:
-                    print(f"❌ Error enrolling student {student_id}: {e}")
+            conn = _get_conn(self.classes_db_path, 'rw')
+            cursor = conn.cursor()
+            
+            # Expand the whole batch inside SQLite instead of one INSERT per student
+            cursor.execute("""
+                INSERT OR IGNORE INTO class_enrollments 
+                (class_id, student_id, enrollment_status)
+                SELECT ?, value, 'enrolled' FROM json_each(?)
+            """, (class_id, json.dumps(list(student_ids))))
+            enrolled_count = cursor.rowcount
             
             conn.commit()
-            print(f"✅ Enrolled {enrolled_count}/{len(student_ids)} students in class ID {class_id}")
+            log.info("Enrolled %d/%d students in class ID %s", enrolled_count, len(student_ids), class_id)
             return enrolled_count
             
         except Exception as e:
-            print(f"❌ Error during enrollment: {e}")
-            conn.rollback()
+            log.error("Error during enrollment: %s", e)
+            if conn:
+                conn.rollback()
             return 0
         finally:
-            conn.close()
+            release_connection(conn)
     
     def get_all_classes(self):
         """Get all classes with summary information"""
-        import sqlite3
-        conn = sqlite3.connect(self.classes_db_path)
-        cursor = conn.cursor()
-        
+        conn = None
         try:
+            conn = _get_conn(self.classes_db_path, 'ro')
+            cursor = conn.cursor()
+            
             cursor.execute("SELECT * FROM class_summary ORDER BY class_name, professor_name")
             
             columns = [desc[0] for desc in cursor.description]
-            classes = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            classes = [dict(zip(columns, row)) for row in cursor]
             
             return classes
             
         except Exception as e:
-            print(f"❌ Error getting classes: {e}")
+            log.error("Error getting classes: %s", e)
             return []
         finally:
-            conn.close()
+            release_connection(conn)
     
-    def get_class_students(self, class_id):
-        """Get all students enrolled in a specific class with their details from attendance.db"""
-        import sqlite3
-        
-        # Get enrolled student IDs from classes.db
-        conn_classes = sqlite3.connect(self.classes_db_path)
-        cursor_classes = conn_classes.cursor()
-        
+    def find_class_id(self, class_name, professor_name):
+        """Look up a class ID by (class_name, professor_name), using the cached mapping when possible"""
+        key = (class_name, professor_name)
+        mapping = _class_id_cache.get(self.classes_db_path)
+        if mapping is None or key not in mapping:
+            # Cold cache, or the class may have been created by another process
+            mapping = {(c['class_name'], c['professor_name']): c['class_id'] for c in self.get_all_classes()}
+            _class_id_cache[self.classes_db_path] = mapping
+        return mapping.get(key)
+    
+    def get_enrolled_student_ids(self, class_id):
+        """IDs of the students enrolled in a class (classes.db only, no student details)"""
+        return [student_id for student_id, _, _ in self._get_enrollments(class_id)]
+    
+    def _get_enrollments(self, class_id):
+        """(student_id, enrollment_status, enrolled_at) rows for a class's enrolled students"""
+        conn_classes = None
         try:
+            conn_classes = _get_conn(self.classes_db_path, 'ro')
+            cursor_classes = conn_classes.cursor()
+            
             cursor_classes.execute("""
                 SELECT student_id, enrollment_status, enrolled_at
                 FROM class_enrollments 
                 WHERE class_id = ? AND enrollment_status = 'enrolled'
             """, (class_id,))
             
-            enrollments = cursor_classes.fetchall()
-            if not enrollments:
-                return []
+            return cursor_classes.fetchall()
             
         except Exception as e:
-            print(f"❌ Error getting class enrollments: {e}")
+            log.error("Error getting class enrollments: %s", e)
             return []
         finally:
-            conn_classes.close()
-        
-        # Get student details from attendance.db
-        conn_attendance = sqlite3.connect(self.attendance_db_path)
-        cursor_attendance = conn_attendance.cursor()
+            release_connection(conn_classes)
+    
+    def get_class_students(self, class_id):
+        """Get all students enrolled in a specific class with their details from attendance.db"""
+        # Get enrolled student IDs from classes.db
+        enrollments = self._get_enrollments(class_id)
+        if not enrollments:
+            return []
         
-        students = []
+        # Get student details from attendance.db for the whole roster in one query
+        # (json_each keeps the enrollment order)
+        conn_attendance = None
         try:
-            for student_id, enrollment_status, enrolled_at in enrollments:
-                cursor_attendance.execute("""
-                    SELECT s.student_id, s.name, s.course, s.year,
-                           COALESCE(sas.present_count, 0) as present_count,
-                           COALESCE(sas.absent_count, 0) as absent_count,
-                           COALESCE(sas.total_sessions, 0) as total_sessions,
-                           sas.last_check_in, sas.status
-                    FROM students s
-                    LEFT JOIN student_attendance_summary sas ON s.student_id = sas.student_id
-                    WHERE s.student_id = ?
-                """, (student_id,))
-                
-                result = cursor_attendance.fetchone()
-                if result:
-                    student_data = {
-                        'student_id': result[0],
-                        'name': result[1],
-                        'course': result[2],
-                        'year': result[3],
-                        'present_count': result[4],
-                        'absent_count': result[5],
-                        'total_sessions': result[6],
-                        'last_check_in': result[7],
-                        'attendance_status': result[8],
-                        'enrollment_status': enrollment_status,
-                        'enrolled_at': enrolled_at
-                    }
-                    students.append(student_data)
+            conn_attendance = _get_conn(self.attendance_db_path, 'ro')
+            cursor_attendance = conn_attendance.cursor()
+            
+            cursor_attendance.execute("""
+                SELECT s.student_id, s.name, s.course, s.year,
+                       COALESCE(sas.present_count, 0) as present_count,
+                       COALESCE(sas.absent_count, 0) as absent_count,
+                       COALESCE(sas.total_sessions, 0) as total_sessions,
+                       sas.last_check_in, sas.status
+                FROM json_each(?) roster
+                JOIN students s ON s.student_id = roster.value
+                LEFT JOIN student_attendance_summary sas ON s.student_id = sas.student_id
+                ORDER BY roster.key
+            """, (json.dumps([student_id for student_id, _, _ in enrollments]),))
+            
+            enrollment_details = {student_id: (status, enrolled_at) for student_id, status, enrolled_at in enrollments}
+            students = []
+            for result in cursor_attendance:
+                enrollment_status, enrolled_at = enrollment_details[result[0]]
+                students.append({
+                    'student_id': result[0],
+                    'name': result[1],
+                    'course': result[2],
+                    'year': result[3],
+                    'present_count': result[4],
+                    'absent_count': result[5],
+                    'total_sessions': result[6],
+                    'last_check_in': result[7],
+                    'attendance_status': result[8],
+                    'enrollment_status': enrollment_status,
+                    'enrolled_at': enrolled_at
+                })
             
             return students
             
         except Exception as e:
-            print(f"❌ Error getting student details: {e}")
+            log.error("Error getting student details: %s", e)
             return []
         finally:
-            conn_attendance.close()
+            release_connection(conn_attendance)
     
     def import_from_excel_data(self, class_name, professor_name, student_data, metadata=None):
         """
@@ -635,7 +716,12 @@ class OptimizedClassManager:
                 return None
             
             # Extract student IDs
-            student_ids = [student.get('studentId') for student in student_data if student.get('studentId')]
+            student_ids = []
+            append_id = student_ids.append
+            for student in student_data:
+                student_id = student.get('studentId')
+                if student_id:
+                    append_id(student_id)
             
             # Ensure students exist in attendance.db first
             self._ensure_students_exist(student_data)
@@ -643,71 +729,72 @@ class OptimizedClassManager:
             # Enroll students
             enrolled_count = self.enroll_students(class_id, student_ids)
             
-            print(f"✅ Successfully imported class: {class_name} - {professor_name}")
-            print(f"   Students enrolled: {enrolled_count}/{len(student_ids)}")
+            log.info("Imported class: %s - %s (%d/%d students enrolled)",
+                     class_name, professor_name, enrolled_count, len(student_ids))
             
             return class_id
             
         except Exception as e:
-            print(f"❌ Error importing class data: {e}")
+            log.error("Error importing class data: %s", e)
             return None
     
     def _ensure_students_exist(self, student_data):
         """Ensure all students exist in the attendance.db students table"""
-        import sqlite3
-        conn = sqlite3.connect(self.attendance_db_path)
-        cursor = conn.cursor()
-        
+        conn = None
         try:
-            for student in student_data:
-                student_id = student.get('studentId')
-                if not student_id:
-                    continue
-                
-                # Convert year level
-                year_level = convert_year_to_integer(student.get('yearLevel', ''))
-                
-                cursor.execute("""
-                    INSERT OR REPLACE INTO students (student_id, name, course, year, updated_at)
-                    VALUES (?, ?, ?, ?, datetime('now'))
-                """, (
-                    student_id,
-                    student.get('studentName', ''),
-                    student.get('course', ''),
-                    year_level
-                ))
-                
-                # Initialize attendance summary if not exists
-                cursor.execute("""
-                    INSERT OR IGNORE INTO student_attendance_summary 
-                    (student_id, total_sessions, present_count, absent_count, status, updated_at)
-                    VALUES (?, 0, 0, 0, 'active', datetime('now'))
-                """, (student_id,))
+            conn = _get_conn(self.attendance_db_path, 'rw')
+            cursor = conn.cursor()
+            
+            payload = json.dumps([
+                {'id': student_id, 'name': name, 'course': course, 'year': convert_year_to_integer(year_level)}
+                for student_id, name, course, year_level in map(_student_row, student_data)
+                if student_id
+            ])
+            
+            # One statement per table for the whole roster, expanded with json_each
+            cursor.execute("""
+                INSERT INTO students (student_id, name, course, year, updated_at)
+                SELECT json_extract(value, '$.id'), json_extract(value, '$.name'),
+                       json_extract(value, '$.course'), json_extract(value, '$.year'), datetime('now')
+                FROM json_each(?) WHERE true
+                ON CONFLICT(student_id) DO UPDATE SET
+                    name = excluded.name, course = excluded.course,
+                    year = excluded.year, updated_at = excluded.updated_at
+            """, (payload,))
+            
+            # Initialize attendance summaries that don't exist yet
+            cursor.execute("""
+                INSERT OR IGNORE INTO student_attendance_summary 
+                (student_id, total_sessions, present_count, absent_count, status, updated_at)
+                SELECT json_extract(value, '$.id'), 0, 0, 0, 'active', datetime('now')
+                FROM json_each(?)
+            """, (payload,))
             
             conn.commit()
             
         except Exception as e:
-            print(f"❌ Error ensuring students exist: {e}")
-            conn.rollback()
+            log.error("Error ensuring students exist: %s", e)
+            if conn:
+                conn.rollback()
         finally:
-            conn.close()
+            release_connection(conn)
     
     def delete_class(self, class_id):
         """Delete a class and all its enrollments"""
-        import sqlite3
-        conn = sqlite3.connect(self.classes_db_path)
-        cursor = conn.cursor()
-        
+        conn = None
         try:
+            conn = _get_conn(self.classes_db_path, 'rw')
+            cursor = conn.cursor()
+            
             # Check if class exists
             cursor.execute("SELECT class_name, professor_name FROM classes WHERE id = ?", (class_id,))
             result = cursor.fetchone()
             if not result:
-                print(f"❌ Class {class_id} not found")
+                log.warning("Class %s not found", class_id)
                 return False
             
             class_name, professor_name = result
-            print(f"🗑️  Deleting class: {class_name} - {professor_name}")
+            log.info("Deleting class: %s - %s", class_name, professor_name)
             
             # Delete enrollments first (will be handled by foreign key cascade)
             cursor.execute("DELETE FROM class_enrollments WHERE class_id = ?", (class_id,))
@@ -722,28 +809,30 @@ class OptimizedClassManager:
             class_deleted = cursor.rowcount
             
             conn.commit()
+            _class_id_cache.pop(self.classes_db_path, None)
             
             if class_deleted > 0:
-                print(f"✅ Successfully deleted class {class_id} ({enrollments_deleted} enrollments, {schedules_deleted} schedules)")
+                log.info("Deleted class %s (%d enrollments, %d schedules)", class_id, enrollments_deleted, schedules_deleted)
                 return True
             else:
-                print(f"❌ Failed to delete class {class_id}")
+                log.error("Failed to delete class %s", class_id)
                 return False
                 
         except Exception as e:
-            print(f"❌ Error deleting class {class_id}: {e}")
-            conn.rollback()
+            log.error("Error deleting class %s: %s", class_id, e)
+            if conn:
+                conn.rollback()
             return False
         finally:
-            conn.close()
+            release_connection(conn)
     
     def unenroll_student(self, class_id, student_id):
         """Remove a student from a class"""
-        import sqlite3
-        conn = sqlite3.connect(self.classes_db_path)
-        cursor = conn.cursor()
-        
+        conn = None
         try:
+            conn = _get_conn(self.classes_db_path, 'rw')
+            cursor = conn.cursor()
+            
             # Check if enrollment exists
             cursor.execute("""
                 SELECT id FROM class_enrollments 
@@ -752,7 +841,7 @@ class OptimizedClassManager:
             
             result = cursor.fetchone()
             if not result:
-                print(f"❌ Student {student_id} not enrolled in class {class_id}")
+                log.warning("Student %s not enrolled in class %s", student_id, class_id)
                 return False
             
             # Update enrollment status instead of deleting (for audit trail)
@@ -766,18 +855,19 @@ class OptimizedClassManager:
             conn.commit()
             
             if updated > 0:
-                print(f"✅ Successfully unenrolled student {student_id} from class {class_id}")
+                log.info("Unenrolled student %s from class %s", student_id, class_id)
                 return True
             else:
-                print(f"❌ Failed to unenroll student {student_id} from class {class_id}")
+                log.error("Failed to unenroll student %s from class %s", student_id, class_id)
                 return False
                 
         except Exception as e:
-            print(f"❌ Error unenrolling student {student_id} from class {class_id}: {e}")
-            conn.rollback()
+            log.error("Error unenrolling student %s from class %s: %s", student_id, class_id, e)
+            if conn:
+                conn.rollback()
             return False
         finally:
-            conn.close()
+            release_connection(conn)
     
 # Backward compatibility functions - use these to gradually migrate your existing code
 def create_class_optimized(class_name, professor_name, students, metadata=None):
@@ -796,13 +886,10 @@ def get_class_students_optimized(class_name, professor_name):
     manager = OptimizedClassManager()
     
     # Find class by name and professor
-    classes = manager.get_all_classes()
-    for class_data in classes:
-        if (class_data['class_name'] == class_name and 
-            class_data['professor_name'] == professor_name):
-            return manager.get_class_students(class_data['class_id'])
-    
-    return []
+    class_id = manager.find_class_id(class_name, professor_name)
+    if class_id is None:
+        return []
+    return manager.get_class_students(class_id)
 
 # Function to setup optimized schema
 def setup_optimized_classes_db():
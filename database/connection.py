@@ -11,10 +11,14 @@ Main Features:
 - Error Handling: Graceful handling of database errors and timeouts
 
 Key Functions:
-- get_db_connection(): Creates optimized SQLite connection with performance settings
+- get_db_connection(): Per-thread cached SQLite connection with performance settings
+  (conn.close() hands it back rather than closing it)
 - get_db_connection_with_retry(): Connection with automatic retry on database locks
 - retry_db_operation(): Decorator for adding retry logic to database operations
 - execute_with_retry(): Execute queries with built-in retry mechanism
+- acquire_connection() / release_connection() / pooled_connection(): Borrow a
+  long-lived connection from the per-database reader pool or single-writer pool
+- backup_database_file() / restore_database_file(): Consistent online backup and restore of a live (WAL) database
 
 Database Optimizations:
 - WAL (Write-Ahead Logging) mode for better concurrency
@@ -29,12 +33,69 @@ Dependencies: SQLite3, config settings, database models
 import sqlite3
 import os
 import time
+import random
+import queue
+import threading
+import atexit
+import itertools
+import weakref
+from contextlib import contextmanager
 from functools import wraps
+from pathlib import Path
 from config.config import Config
 
-def retry_db_operation(max_retries=3, delay=0.1):
-    """Decorator to retry database operations if database is locked"""
+__all__ = [
+    'get_db_connection', 'get_db_connection_with_retry', 'release_thread_connections',
+    'close_thread_connections', 'retry_db_operation', 'execute_with_retry',
+    'get_pool', 'acquire_connection', 'release_connection', 'pooled_connection', 'close_all_pools',
+    'backup_path_for', 'backup_database_file', 'restore_database_file',
+]
+
+BUSY_TIMEOUT_SECONDS = 30.0
+# Per-connection prepared statement cache (sqlite3 default is 128); connections are long-lived now
+STATEMENT_CACHE_SIZE = 512
+
+_CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode = WAL',
+    'PRAGMA synchronous = NORMAL',
+    'PRAGMA cache_size = -65536',  # 64 MiB, independent of page size
+    'PRAGMA temp_store = memory',
+    'PRAGMA mmap_size = 268435456',
+    'PRAGMA busy_timeout = 30000',
+    'PRAGMA foreign_keys = ON',
+    'PRAGMA journal_size_limit = 67108864',  # truncate the WAL back to 64 MiB after checkpoints
+    'PRAGMA wal_autocheckpoint = 1000',
+)
+
+# Pragmas that only affect the reading side; journal_mode needs write access.
+# query_only makes reader connections unable to take a write lock at all.
+_READER_PRAGMAS = tuple(p for p in _CONNECTION_PRAGMAS if 'journal_mode' not in p) + ('PRAGMA query_only = ON',)
+
+# Long-lived writable connections re-run PRAGMA optimize after this many releases
+OPTIMIZE_EVERY = 1000
+
+# Extended result codes keep the primary code in the low byte
+_BUSY_ERROR_CODES = (getattr(sqlite3, 'SQLITE_BUSY', 5), getattr(sqlite3, 'SQLITE_LOCKED', 6))
+
+def _is_busy_error(e):
+    """True if an OperationalError is SQLITE_BUSY/SQLITE_LOCKED"""
+    code = getattr(e, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in _BUSY_ERROR_CODES
+    # Python < 3.11 (or errors raised by this module) carry no error code
+    return "database is locked" in str(e)
+
+def retry_db_operation(max_retries=3, delay=0.1, max_delay=1.0, for_writes=True):
+    """
+    Decorator to retry database operations if database is locked (capped exponential backoff with full jitter).
+    
+    Reads already wait up to busy_timeout inside SQLite, so for_writes=False
+    leaves the function unwrapped and lets busy errors surface directly.
+    """
     def decorator(func):
+        if not for_writes:
+            return func
+        
         @wraps(func)
         def wrapper(*args, **kwargs):
             _delay = delay  # Initialize local delay variable
@@ -42,9 +103,10 @@ def retry_db_operation(max_retries=3, delay=0.1):
                 try:
                     return func(*args, **kwargs)
                 except sqlite3.OperationalError as e:
-                    if "database is locked" in str(e) and attempt < max_retries - 1:
-                        time.sleep(_delay)
-                        _delay *= 2  # Exponential backoff
+                    if attempt < max_retries - 1 and _is_busy_error(e):
+                        # Full jitter so writers that collided don't all wake up together
+                        time.sleep(random.uniform(0, min(_delay, max_delay)))
+                        _delay = min(_delay * 2, max_delay)  # Capped exponential backoff
                         continue
                     else:
                         raise e
@@ -52,32 +114,396 @@ def retry_db_operation(max_retries=3, delay=0.1):
         return wrapper
     return decorator
 
-def get_db_connection():
-    """Get database connection with optimized settings for concurrency"""
-    try:
-        if not os.path.exists(Config.DATABASE_PATH):
+class _ThreadConnection(sqlite3.Connection):
+    """
+    Connection cached per thread by get_db_connection().
+    
+    Each get_db_connection() call gets its own _Checkout handle onto it. Closing
+    the outermost handle rolls back anything left uncommitted and leaves the
+    configured connection open for the thread's next call.
+    """
+    
+    _checkouts = 0
+    _releases = 0
+    _closed = False
+    
+    def close(self):
+        self._checkouts = max(self._checkouts - 1, 0)
+        if self._checkouts == 0:
+            self.reset()
+            self._releases += 1
+            maybe_optimize(self, self._releases)
+    
+    def reset(self):
+        """Drop any open transaction and mark the connection as free"""
+        self._checkouts = 0
+        try:
+            if self.in_transaction:
+                self.rollback()
+        except sqlite3.ProgrammingError:
+            pass  # already closed for real
+    
+    def close_for_real(self):
+        self._closed = True
+        sqlite3.Connection.close(self)
+
+_savepoint_ids = itertools.count(1)
+
+class _Checkout:
+    """
+    One get_db_connection() checkout of the thread's connection.
+    
+    The outermost checkout commits, rolls back and closes the connection as usual.
+    A nested checkout (a helper called while its caller still holds the connection)
+    runs inside its own SAVEPOINT: its commit() releases only its own writes into the
+    caller's transaction, its rollback() and close() discard only its own writes.
+    close() is idempotent, so an extra close never ends the caller's checkout.
+    Everything else is delegated to the underlying connection.
+    """
+    
+    __slots__ = ('_conn', '_savepoint', '_done')
+    
+    def __init__(self, conn):
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_done', False)
+        savepoint = None
+        if conn._checkouts > 1:
+            savepoint = f'checkout_{next(_savepoint_ids)}'
+            conn.execute(f'SAVEPOINT {savepoint}')
+        object.__setattr__(self, '_savepoint', savepoint)
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+    
+    def _savepoint_statement(self, *statements):
+        try:
+            for statement in statements:
+                self._conn.execute(statement)
+        except sqlite3.OperationalError:
+            pass  # savepoint already ended by an outer COMMIT/ROLLBACK or executescript()
+    
+    def commit(self):
+        if self._savepoint is None:
+            self._conn.commit()
+        else:
+            # Keep later writes in this checkout scoped to a fresh savepoint
+            self._savepoint_statement(f'RELEASE {self._savepoint}', f'SAVEPOINT {self._savepoint}')
+    
+    def rollback(self):
+        if self._savepoint is None:
+            self._conn.rollback()
+        else:
+            self._savepoint_statement(f'ROLLBACK TO {self._savepoint}')
+    
+    def close(self):
+        if self._done:
+            return
+        object.__setattr__(self, '_done', True)
+        if self._savepoint is None:
+            self._conn.close()
+        else:
+            self._savepoint_statement(f'ROLLBACK TO {self._savepoint}', f'RELEASE {self._savepoint}')
+            self._conn._checkouts = max(self._conn._checkouts - 1, 0)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+_tls = threading.local()
+_thread_connections = weakref.WeakSet()
+
+# Database paths already known to exist (schema created), so new connections skip the stat + create check
+_initialized_paths = set()
+_init_lock = threading.Lock()
+
+def _ensure_database_initialized(database_path):
+    if database_path in _initialized_paths:
+        return
+    with _init_lock:
+        if database_path in _initialized_paths:
+            return
+        if not os.path.exists(database_path):
             from .models import create_all_tables
             create_all_tables()
+        _initialized_paths.add(database_path)
+
+def get_db_connection():
+    """Get this thread's database connection (created and configured once per thread and database path)"""
+    try:
+        conns = getattr(_tls, 'conns', None)
+        if conns is None:
+            conns = _tls.conns = {}
         
-        conn = sqlite3.connect(
-            Config.DATABASE_PATH,
-            timeout=30.0,
-            check_same_thread=False
-        )
+        conn = conns.get(Config.DATABASE_PATH)
+        if conn is None or conn._closed:
+            _ensure_database_initialized(Config.DATABASE_PATH)
+            
+            conn = sqlite3.connect(
+                Config.DATABASE_PATH,
+                timeout=BUSY_TIMEOUT_SECONDS,
+                check_same_thread=False,
+                cached_statements=STATEMENT_CACHE_SIZE,
+                factory=_ThreadConnection
+            )
+            conn.row_factory = sqlite3.Row
+            
+            # Enable optimizations for better concurrency
+            _configure_connection(conn)
+            
+            conns[Config.DATABASE_PATH] = conn
+            _thread_connections.add(conn)
+        
+        conn._checkouts += 1
+        return _Checkout(conn)
+    except Exception as e:
+        raise e
+
+def release_thread_connections():
+    """Reset this thread's cached connections (e.g. at request teardown, in case a caller never closed one)"""
+    for conn in getattr(_tls, 'conns', {}).values():
+        conn.reset()
+
+def close_thread_connections():
+    """Really close every thread's cached connection (they reopen on next use)"""
+    for conn in list(_thread_connections):
+        try:
+            conn.close_for_real()
+        except sqlite3.Error:
+            pass
+
+atexit.register(close_thread_connections)
+
+def _configure_connection(conn, readonly=False):
+    """Apply the standard concurrency/performance pragmas to a new connection"""
+    for pragma in (_READER_PRAGMAS if readonly else _CONNECTION_PRAGMAS):
+        conn.execute(pragma)
+    if not readonly:
+        # Cheap on-open check; may run ANALYZE on tables whose stats are missing or stale
+        conn.execute('PRAGMA optimize = 0x10002')
+
+def maybe_optimize(conn, release_count):
+    """Run PRAGMA optimize on a long-lived connection every OPTIMIZE_EVERY releases"""
+    if release_count % OPTIMIZE_EVERY:
+        return
+    try:
+        conn.execute('PRAGMA optimize')
+    except sqlite3.Error:
+        pass  # statistics refresh is best-effort; never fail the caller's release
+
+class _ConnectionPool:
+    """
+    Bounded pool of long-lived connections to one database file.
+    
+    Read-only pools open connections with a mode=ro URI so they can never take
+    the write lock; the writer pool holds a single connection, which serializes
+    writers the same way SQLite would. A thread that already holds a connection
+    from a pool gets the same connection back on nested acquires instead of
+    deadlocking against itself.
+    """
+    
+    def __init__(self, database_path, size, readonly=False):
+        self.database_path = database_path
+        self.size = size
+        self.readonly = readonly
+        # LIFO: the most recently released connection (warmest page cache) is handed out first
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._created = 0
+        self._releases = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+    
+    def _connect(self):
+        if self.readonly:
+            uri = Path(self.database_path).as_uri() + '?mode=ro'
+            # Autocommit: readers never need the implicit BEGIN the sqlite3 module would issue
+            conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False,
+                                   cached_statements=STATEMENT_CACHE_SIZE, isolation_level=None)
+        else:
+            conn = sqlite3.connect(self.database_path, timeout=BUSY_TIMEOUT_SECONDS, check_same_thread=False,
+                                   cached_statements=STATEMENT_CACHE_SIZE)
         conn.row_factory = sqlite3.Row
+        _configure_connection(conn, readonly=self.readonly)
+        _pool_owners[id(conn)] = self
+        return conn
+    
+    def _discard(self, conn):
+        _pool_owners.pop(id(conn), None)
+        with self._lock:
+            self._created -= 1
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
         
-        # Enable optimizations for better concurrency
-        conn.execute('PRAGMA journal_mode = WAL')
-        conn.execute('PRAGMA synchronous = NORMAL')
-        conn.execute('PRAGMA cache_size = 10000')
-        conn.execute('PRAGMA temp_store = memory')
-        conn.execute('PRAGMA mmap_size = 268435456')
-        conn.execute('PRAGMA busy_timeout = 30000')
-        conn.execute('PRAGMA foreign_keys = ON')
+        if can_create:
+            try:
+                return self._connect()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        
+        try:
+            return self._idle.get(timeout=BUSY_TIMEOUT_SECONDS)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f"database is locked (no free connection for {self.database_path})")
+    
+    def acquire(self):
+        """Check a connection out of the pool (re-entrant per thread)"""
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            self._local.depth += 1
+            return held
         
+        conn = self._checkout()
+        self._local.conn = conn
+        self._local.depth = 1
         return conn
-    except Exception as e:
-        raise e
+    
+    def release(self, conn):
+        """Return a connection obtained from acquire()"""
+        if getattr(self._local, 'conn', None) is conn:
+            self._local.depth -= 1
+            if self._local.depth > 0:
+                return
+            self._local.conn = None
+        
+        try:
+            # Never hand the next borrower someone else's half-finished transaction
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            # Closed or broken connection - drop it and let the pool open a new one
+            self._discard(conn)
+            return
+        if not self.readonly:
+            self._releases += 1
+            maybe_optimize(conn, self._releases)
+        self._idle.put(conn)
+    
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of the with-block"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+    
+    def close_all(self):
+        """Close every idle connection in the pool"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pool_owners = {}
+
+def get_pool(database_path=None, readonly=False):
+    """Get (creating on first use) the reader or writer pool for a database file"""
+    key = (os.path.abspath(database_path or Config.DATABASE_PATH), readonly)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _ConnectionPool(key[0], Config.DB_READ_POOL_SIZE if readonly else 1, readonly=readonly)
+                _pools[key] = pool
+    return pool
+
+def acquire_connection(database_path=None, readonly=False):
+    """
+    Check out a pooled connection; hand it back with release_connection().
+    
+    readonly=True borrows one of the read-only connections, otherwise the
+    database's single writer connection is used.
+    """
+    return get_pool(database_path, readonly).acquire()
+
+def release_connection(conn):
+    """Return a pooled connection (plain connections are simply closed)"""
+    if conn is None:
+        return
+    pool = _pool_owners.get(id(conn))
+    if pool is None:
+        conn.close()
+    else:
+        pool.release(conn)
+
+def pooled_connection(database_path=None, readonly=False):
+    """Context manager yielding a pooled connection; do not close it"""
+    return get_pool(database_path, readonly).connection()
+
+def close_all_pools():
+    """Close all idle pooled connections (e.g. before replacing database files)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
+
+atexit.register(close_all_pools)
+
+def backup_path_for(database_path):
+    """Timestamped backup path for a database, next to the database file"""
+    return f"{database_path}.backup_{time.strftime('%Y%m%d_%H%M%S')}"
+
+def backup_database_file(source_path, backup_path, pages=1000):
+    """Copy a database with SQLite's online backup API (includes un-checkpointed WAL pages)"""
+    src = sqlite3.connect(Path(source_path).resolve().as_uri() + '?mode=ro', uri=True)
+    try:
+        dst = sqlite3.connect(backup_path)
+        try:
+            with dst:
+                src.backup(dst, pages=pages)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    return backup_path
+
+def restore_database_file(backup_path, database_path):
+    """
+    Overwrite a database with a backup's contents through SQLite's online backup API.
+    
+    Copying the file over a live WAL database would leave its -wal file behind to be
+    replayed on top of the restored pages; writing through SQLite keeps both consistent.
+    """
+    src = sqlite3.connect(Path(backup_path).resolve().as_uri() + '?mode=ro', uri=True)
+    try:
+        dst = sqlite3.connect(database_path, timeout=BUSY_TIMEOUT_SECONDS)
+        try:
+            # All pages in one step, so no other writer can interleave with the restore
+            src.backup(dst)
+            dst.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        finally:
+            dst.close()
+    finally:
+        src.close()
+    return database_path
 
 @retry_db_operation()
 def get_db_connection_with_retry():
@@ -85,36 +511,35 @@ def get_db_connection_with_retry():
     return get_db_connection()
 
 def execute_with_retry(query, params=None, fetch=False):
-    """Execute a query with automatic retry on database lock"""
-    @retry_db_operation()
+    """
+    Execute a query; writes (fetch=False) are retried on database lock, reads rely on busy_timeout.
+    
+    Reads run on the read-only pool, writes on the database's single writer connection.
+    """
+    @retry_db_operation(for_writes=not fetch)
     def _execute():
-        conn = None
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
-            
-            if fetch:
-                if fetch == 'one':
-                    result = cursor.fetchone()
+        with pooled_connection(readonly=bool(fetch)) as conn:
+            try:
+                cursor = conn.cursor()
+                
+                if params:
+                    cursor.execute(query, params)
                 else:
-                    result = cursor.fetchall()
-            else:
-                result = cursor.rowcount
-            
-            conn.commit()
-            return result
-            
-        except Exception as e:
-            if conn:
+                    cursor.execute(query)
+                
+                if fetch:
+                    if fetch == 'one':
+                        result = cursor.fetchone()
+                    else:
+                        result = cursor.fetchall()
+                else:
+                    result = cursor.rowcount
+                
+                conn.commit()
+                return result
+                
+            except Exception as e:
                 conn.rollback()
-            raise e
-        finally:
-            if conn:
-                conn.close()
+                raise e
     
-    return _execute()
\ No newline at end of file
+    return _execute()
@@ -19,21 +19,19 @@ Features:
 import os
 import sys
 import sqlite3
-import shutil
-from datetime import datetime
 
 # Add the project root to the path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from database.models import migrate_tables, verify_database_integrity
+from database.models import migrate_tables, verify_database_integrity, count_table_rows
+from database.connection import backup_path_for, backup_database_file
 from config.config import Config
 
 def backup_database():
     """Create a backup of the current database"""
     try:
         if os.path.exists(Config.DATABASE_PATH):
-            backup_path = f"{Config.DATABASE_PATH}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            shutil.copy2(Config.DATABASE_PATH, backup_path)
+            backup_path = backup_database_file(Config.DATABASE_PATH, backup_path_for(Config.DATABASE_PATH))
             print(f"Database backed up to: {backup_path}")
             return backup_path
         else:
@@ -57,10 +55,8 @@ def show_database_info(title):
         tables = cursor.fetchall()
         
         print(f"Tables in database: {len(tables)}")
-        for table in tables:
-            table_name = table[0]
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            count = cursor.fetchone()[0]
+        table_counts = count_table_rows(cursor, [table[0] for table in tables])
+        for table_name, count in table_counts.items():
             print(f"  - {table_name}: {count} records")
         
         conn.close()
@@ -20,6 +20,7 @@ Database Tables:
 - denied_attempts: Failed check-in attempts with device fingerprint references
 - device_fingerprints: Centralized device tracking and usage limits
 - student_attendance_summary: Aggregated attendance statistics per student
+  (check-ins are counted by a trigger on class_attendees)
 - settings: System configuration and security settings
 
 Key Improvements:
@@ -34,13 +35,23 @@ Key Improvements:
 Key Functions:
 - create_all_tables(): Initialize complete database schema
 - migrate_tables(): Handle schema upgrades and data migration
+- maintenance(): Token cleanup and incremental space reclaim (run when a session is stopped)
 
 Used by: Database connection module, initialization scripts
 Dependencies: SQLite3, config settings
 """
 
+import logging
+import re
 import sqlite3
+import sys
+import textwrap
+import time
+from collections import defaultdict
 from config.config import Config, DEFAULT_SETTINGS
+from .connection import BUSY_TIMEOUT_SECONDS, STATEMENT_CACHE_SIZE, _configure_connection, pooled_connection
+
+log = logging.getLogger(__name__)
 
 TABLES = {
     'students': '''
@@ -136,15 +147,13 @@ TABLES = {
             usage_count INTEGER DEFAULT 1,
             device_info TEXT,
             is_blocked BOOLEAN DEFAULT FALSE,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
             updated_at TEXT DEFAULT CURRENT_TIMESTAMP
         )
     ''',
     
     'student_attendance_summary': '''
         CREATE TABLE IF NOT EXISTS student_attendance_summary (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_id TEXT NOT NULL,
+            student_id TEXT PRIMARY KEY,
             total_sessions INTEGER DEFAULT 0,
             present_count INTEGER DEFAULT 0,
             late_count INTEGER DEFAULT 0,
@@ -153,42 +162,39 @@ TABLES = {
             last_check_in TEXT,
             status TEXT DEFAULT 'active',
             updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (last_session_id) REFERENCES attendance_sessions (id) ON DELETE SET NULL,
-            UNIQUE(student_id)
-        )
+            FOREIGN KEY (last_session_id) REFERENCES attendance_sessions (id) ON DELETE SET NULL
+        ) WITHOUT ROWID
     ''',
     
     'settings': '''
         CREATE TABLE IF NOT EXISTS settings (
-            id TEXT PRIMARY KEY,
+            id TEXT PRIMARY KEY CHECK (id = 'config'),
             max_uses_per_device INTEGER DEFAULT 1,
             time_window_minutes INTEGER DEFAULT 1440,
             enable_fingerprint_blocking BOOLEAN DEFAULT TRUE,
             session_timeout_minutes INTEGER DEFAULT 30,
             max_devices_per_student INTEGER DEFAULT 3,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
             updated_at TEXT DEFAULT CURRENT_TIMESTAMP
-        )
+        ) WITHOUT ROWID
     ''',
     
     'session_enrollments': '''
         CREATE TABLE IF NOT EXISTS session_enrollments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
             profile_id INTEGER NOT NULL,
             student_id TEXT NOT NULL,
             enrolled_at TEXT DEFAULT CURRENT_TIMESTAMP,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (profile_id) REFERENCES session_profiles (id) ON DELETE CASCADE,
             FOREIGN KEY (student_id) REFERENCES students (student_id) ON DELETE CASCADE,
-            UNIQUE(profile_id, student_id)
-        )
+            PRIMARY KEY (profile_id, student_id)
+        ) WITHOUT ROWID
     '''
 }
 
 # Indexes for better query performance
 INDEXES = {
-    'idx_class_attendees_student': 'CREATE INDEX IF NOT EXISTS idx_class_attendees_student ON class_attendees(student_id)',
-    'idx_class_attendees_session': 'CREATE INDEX IF NOT EXISTS idx_class_attendees_session ON class_attendees(session_id)',
+    # Covering indexes: per-student summary aggregates and per-session student lists read only the index
+    'idx_class_attendees_student_session_time': 'CREATE INDEX IF NOT EXISTS idx_class_attendees_student_session_time ON class_attendees(student_id, session_id, checked_in_at)',
+    'idx_class_attendees_session_student': 'CREATE INDEX IF NOT EXISTS idx_class_attendees_session_student ON class_attendees(session_id, student_id)',
     'idx_class_attendees_device': 'CREATE INDEX IF NOT EXISTS idx_class_attendees_device ON class_attendees(device_fingerprint_id)',
     'idx_tokens_device': 'CREATE INDEX IF NOT EXISTS idx_tokens_device ON tokens(device_fingerprint_id)',
     'idx_tokens_generated': 'CREATE INDEX IF NOT EXISTS idx_tokens_generated ON tokens(generated_at)',
@@ -197,11 +203,79 @@ INDEXES = {
     'idx_denied_attempts_time': 'CREATE INDEX IF NOT EXISTS idx_denied_attempts_time ON denied_attempts(attempted_at)',
     'idx_device_fingerprints_hash': 'CREATE INDEX IF NOT EXISTS idx_device_fingerprints_hash ON device_fingerprints(fingerprint_hash)',
     'idx_sessions_profile': 'CREATE INDEX IF NOT EXISTS idx_sessions_profile ON attendance_sessions(profile_id)',
-    'idx_sessions_active': 'CREATE INDEX IF NOT EXISTS idx_sessions_active ON attendance_sessions(is_active)',
-    'idx_enrollments_profile': 'CREATE INDEX IF NOT EXISTS idx_enrollments_profile ON session_enrollments(profile_id)',
     'idx_enrollments_student': 'CREATE INDEX IF NOT EXISTS idx_enrollments_student ON session_enrollments(student_id)',
+    # Composite indexes for the check-in / reporting hot paths
+    'idx_class_attendees_session_device': 'CREATE INDEX IF NOT EXISTS idx_class_attendees_session_device ON class_attendees(session_id, device_fingerprint_id)',
+    'idx_class_attendees_student_time': 'CREATE INDEX IF NOT EXISTS idx_class_attendees_student_time ON class_attendees(student_id, checked_in_at DESC)',
+    'idx_denied_attempts_session_time': 'CREATE INDEX IF NOT EXISTS idx_denied_attempts_session_time ON denied_attempts(session_id, attempted_at DESC)',
+    'idx_students_course': 'CREATE INDEX IF NOT EXISTS idx_students_course ON students(course, student_id)',
+    # Student lists are read ORDER BY name; walking this index avoids a full sort per request
+    'idx_students_name': 'CREATE INDEX IF NOT EXISTS idx_students_name ON students(name)',
+    # get_active_session: seek the active rows already in newest-first order (no sort for ORDER BY ... LIMIT 1)
+    'idx_sessions_active_created': 'CREATE INDEX IF NOT EXISTS idx_sessions_active_created ON attendance_sessions(is_active, created_at DESC)',
+    # Token cleanup: seek stale used tokens, and resolve the ON DELETE SET NULL children without scans
+    'idx_tokens_cleanup': 'CREATE INDEX IF NOT EXISTS idx_tokens_cleanup ON tokens(used, generated_at)',
+    'idx_class_attendees_token': 'CREATE INDEX IF NOT EXISTS idx_class_attendees_token ON class_attendees(token_id)',
+    'idx_denied_attempts_token': 'CREATE INDEX IF NOT EXISTS idx_denied_attempts_token ON denied_attempts(token_id)',
 }
 
+def _join_sql(statements):
+    """Join SQL statements into one script, dedented so SQLite parses (and stores) no indentation"""
+    return ';\n'.join(textwrap.dedent(statement).strip() for statement in statements)
+
+# Schema DDL joined once at import, so migrate_tables hands each group to SQLite in a single executescript
+_SCHEMA_TABLES_DDL = _join_sql(TABLES.values()) + ';'
+_SCHEMA_INDEXES_DDL = _join_sql(INDEXES.values()) + ';'
+
+# Stored in PRAGMA user_version once migrate_tables succeeds; later runs return straight away.
+# Bump it whenever TABLES, INDEXES, TRIGGERS or the migration steps change.
+SCHEMA_VERSION = 3
+
+# Indexes superseded by the composite indexes / primary keys above (dropped by migrate_tables)
+OBSOLETE_INDEXES = ['idx_class_attendees_student', 'idx_class_attendees_session', 'idx_enrollments_profile',
+                    'idx_sessions_active']
+
+# Small key-addressed tables stored clustered on their natural key; migrate_tables rebuilds older rowid copies
+WITHOUT_ROWID_TABLES = ['settings', 'student_attendance_summary', 'session_enrollments']
+
+# Columns removed from the schema (duplicates of first_seen / enrolled_at, or never read);
+# migrate_tables drops them from existing databases
+OBSOLETE_COLUMNS = [
+    ('device_fingerprints', 'created_at'),
+    ('session_enrollments', 'created_at'),
+    ('settings', 'created_at'),
+]
+
+# Rows deleted per write transaction by cleanup_old_tokens, so check-ins aren't blocked for long
+TOKEN_CLEANUP_BATCH_SIZE = 1000
+
+# Triggers keeping student_attendance_summary in step with class_attendees inside the check-in transaction
+TRIGGERS = {
+    'trg_class_attendees_summary_insert': '''
+        CREATE TRIGGER IF NOT EXISTS trg_class_attendees_summary_insert
+        AFTER INSERT ON class_attendees
+        BEGIN
+            INSERT INTO student_attendance_summary
+            (student_id, total_sessions, present_count, last_session_id, last_check_in, status, updated_at)
+            VALUES (NEW.student_id, 1, 1, NEW.session_id, NEW.checked_in_at, 'present', datetime('now'))
+            ON CONFLICT(student_id) DO UPDATE SET
+                total_sessions = total_sessions + 1,
+                present_count = present_count + 1,
+                last_session_id = excluded.last_session_id,
+                last_check_in = excluded.last_check_in,
+                status = 'present',
+                updated_at = excluded.updated_at;
+        END
+    ''',
+}
+
+def _connect(database_path=None):
+    """Open a connection with WAL and the standard pragmas from database.connection"""
+    conn = sqlite3.connect(database_path or Config.DATABASE_PATH, timeout=BUSY_TIMEOUT_SECONDS,
+                           cached_statements=STATEMENT_CACHE_SIZE)
+    _configure_connection(conn)
+    return conn
+
 def create_all_tables():
     """
     Create all database tables with complete schema.
@@ -220,7 +294,7 @@ def create_all_tables():
         return migrate_tables()
         
     except Exception as e:
-        print(f"Database initialization error: {e}")
+        log.error("Database initialization error: %s", e)
         return False
 
 def get_table_info(table_name):
@@ -234,19 +308,33 @@ def get_table_info(table_name):
         list: List of column information tuples
     """
     try:
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        cursor = conn.cursor()
-        
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = cursor.fetchall()
-        
-        conn.close()
-        return columns
+        with pooled_connection(readonly=True) as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            
+            cursor.execute(f"PRAGMA table_info({table_name})")
+            return cursor.fetchall()
         
     except Exception as e:
-        print(f"Error getting table info for {table_name}: {e}")
+        log.error("Error getting table info for %s: %s", table_name, e)
         return []
 
+def list_tables(cursor):
+    """Names of all tables in the database, from a single sqlite_master read"""
+    return [row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")]
+
+def count_table_rows(cursor, table_names):
+    """Exact row counts for several tables in one UNION ALL query -> {table_name: count}"""
+    table_names = list(table_names)
+    counts = {}
+    for i in range(0, len(table_names), _MAX_UNION_TABLES):
+        chunk = table_names[i:i + _MAX_UNION_TABLES]
+        union_sql = " UNION ALL ".join(
+            'SELECT ?, COUNT(*) FROM "{}"'.format(name.replace('"', '""')) for name in chunk
+        )
+        counts.update(cursor.execute(union_sql, chunk))
+    return counts
+
 def verify_database_integrity():
     """
     Verify database integrity and check for any issues.
@@ -255,24 +343,20 @@ def verify_database_integrity():
         dict: Dictionary containing integrity check results
     """
     try:
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        cursor = conn.cursor()
-        
-        # Check PRAGMA integrity
-        cursor.execute('PRAGMA integrity_check')
-        integrity_result = cursor.fetchone()[0]
-        
-        # Check foreign key integrity
-        cursor.execute('PRAGMA foreign_key_check')
-        foreign_key_issues = cursor.fetchall()
-        
-        # Get table counts
-        table_counts = {}
-        for table_name in TABLES.keys():
-            cursor.execute(f'SELECT COUNT(*) FROM {table_name}')
-            table_counts[table_name] = cursor.fetchone()[0]
-        
-        conn.close()
+        with pooled_connection(readonly=True) as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            
+            # Check PRAGMA integrity
+            cursor.execute('PRAGMA integrity_check')
+            integrity_result = cursor.fetchone()[0]
+            
+            # Check foreign key integrity
+            cursor.execute('PRAGMA foreign_key_check')
+            foreign_key_issues = cursor.fetchall()
+            
+            # Get table counts
+            table_counts = count_table_rows(cursor, TABLES.keys())
         
         return {
             'integrity_ok': integrity_result == 'ok',
@@ -282,52 +366,108 @@ def verify_database_integrity():
         }
         
     except Exception as e:
-        print(f"Error verifying database integrity: {e}")
+        log.error("Error verifying database integrity: %s", e)
         return {
             'integrity_ok': False,
             'error': str(e)
         }
 
+def _rebuild_without_rowid(cursor, table_name):
+    """Copy an existing rowid table into its WITHOUT ROWID definition from TABLES; returns True if rebuilt"""
+    cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,))
+    row = cursor.fetchone()
+    if row is None or 'WITHOUT ROWID' in row[0].upper():
+        return False
+    
+    rebuild_name = f'{table_name}_rebuild'
+    old_columns = [col[1] for col in cursor.execute(f'PRAGMA table_info({table_name})')]
+    cursor.execute(f'DROP TABLE IF EXISTS {rebuild_name}')
+    cursor.execute(TABLES[table_name].replace(
+        f'CREATE TABLE IF NOT EXISTS {table_name} ', f'CREATE TABLE {rebuild_name} ', 1))
+    new_columns = [col[1] for col in cursor.execute(f'PRAGMA table_info({rebuild_name})')]
+    columns = ', '.join(col for col in new_columns if col in old_columns)
+    
+    # OR IGNORE: the new primary key is the old UNIQUE key, so nothing is lost
+    cursor.execute(f'INSERT OR IGNORE INTO {rebuild_name} ({columns}) SELECT {columns} FROM {table_name}')
+    cursor.execute(f'DROP TABLE {table_name}')
+    cursor.execute(f'ALTER TABLE {rebuild_name} RENAME TO {table_name}')
+    return True
+
+def _run_migration_step(cursor, description, *queries):
+    """Run one data-migration step's statements in a savepoint; on failure only that step is rolled back"""
+    log.info(description)
+    cursor.execute('SAVEPOINT migration_step')
+    try:
+        for query in queries:
+            cursor.execute(query)
+    except sqlite3.Error as e:
+        cursor.execute('ROLLBACK TO migration_step')
+        log.warning("Step skipped (%s)", e)
+    cursor.execute('RELEASE migration_step')
+
 def migrate_tables():
     """Apply database migrations and updates"""
     try:
-        print("Running database migrations...")
+        log.info("Running database migrations...")
         
         # Ensure database directory exists
         Config.ensure_database_directory()
         
-        conn = sqlite3.connect(Config.DATABASE_PATH)
+        conn = sqlite3.connect(Config.DATABASE_PATH, timeout=BUSY_TIMEOUT_SECONDS,
+                               cached_statements=STATEMENT_CACHE_SIZE)
         cursor = conn.cursor()
         
         # Enable foreign key constraints
         cursor.execute('PRAGMA foreign_keys = ON')
         
+        # Page size and auto_vacuum can only be chosen before the first table is created
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master")
+        if cursor.fetchone()[0] == 0:
+            cursor.execute('PRAGMA page_size = 8192')
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        
+        # Already migrated to this schema version, with every table still present: nothing to do
+        cursor.execute('PRAGMA user_version')
+        schema_version = cursor.fetchone()[0]
+        if schema_version >= SCHEMA_VERSION:
+            placeholders = ', '.join('?' * len(TABLES))
+            cursor.execute(f"SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN ({placeholders})",
+                           tuple(TABLES))
+            if cursor.fetchone()[0] == len(TABLES):
+                conn.close()
+                log.info("Database schema is current (version %d)", schema_version)
+                return True
+        
+        # WAL and the standard pragmas (journal mode persists in the database file)
+        _configure_connection(conn)
+        
+        # The whole migration runs in one explicit write transaction (one commit/fsync)
+        conn.isolation_level = None
+        
         # Check if this is a new database or needs migration
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='attendances'")
         has_old_attendances = cursor.fetchone() is not None
         
         if has_old_attendances:
-            print("Migrating from old schema to new normalized schema...")
+            log.info("Migrating from old schema to new normalized schema...")
             
-            # Create new tables
-            for table_name, query in TABLES.items():
-                print(f"Creating/updating table: {table_name}")
-                cursor.execute(query)
+            # Open the migration transaction and create new tables in one script
+            log.info("Creating/updating %d tables...", len(TABLES))
+            cursor.executescript(f'BEGIN IMMEDIATE;\n{_SCHEMA_TABLES_DDL}')
             
-            # Create indexes for better performance
-            print("Creating database indexes...")
+            # Create indexes for better performance (one by one: legacy tables may lack some indexed columns)
+            log.info("Creating database indexes...")
             for index_name, index_query in INDEXES.items():
                 try:
                     cursor.execute(index_query)
                 except Exception as e:
-                    print(f"Note: Could not create index {index_name}: {e}")
+                    log.warning("Could not create index %s: %s", index_name, e)
             
             # First, migrate device fingerprints data
-            print("Migrating device fingerprint data...")
-            cursor.execute('''
+            _run_migration_step(cursor, "Migrating device fingerprint data...", '''
                 INSERT OR IGNORE INTO device_fingerprints 
                 (fingerprint_hash, first_seen, last_seen, usage_count, device_info, is_blocked)
-                SELECT DISTINCT
+                SELECT
                     COALESCE(fingerprint_hash, device_signature, 'unknown') as fingerprint_hash,
                     MIN(created_at) as first_seen,
                     MAX(created_at) as last_seen,
@@ -340,8 +480,7 @@ def migrate_tables():
             ''')
             
             # Migrate attendance data with device fingerprint foreign keys
-            print("Migrating attendance data with device fingerprint references...")
-            cursor.execute('''
+            _run_migration_step(cursor, "Migrating attendance data with device fingerprint references...", '''
                 INSERT OR IGNORE INTO class_attendees 
                 (student_id, session_id, device_fingerprint_id, checked_in_at)
                 SELECT 
@@ -352,44 +491,52 @@ def migrate_tables():
                 FROM attendances a
                 LEFT JOIN device_fingerprints df ON 
                     df.fingerprint_hash = COALESCE(a.fingerprint_hash, a.device_signature, 'unknown')
-                    AND (df.device_info = a.device_info OR (df.device_info IS NULL AND a.device_info IS NULL))
+                    AND df.device_info IS a.device_info
                 WHERE a.student_id IS NOT NULL
             ''')
             
-            # Migrate denied attempts data with device fingerprint references
-            print("Migrating denied attempts data...")
-            cursor.execute('''
-                INSERT OR IGNORE INTO denied_attempts 
+            # Migrate denied attempts data with device fingerprint references.
+            # Snapshot the legacy rows first so the insert never reads the rows it is adding,
+            # and the duplicate check is one idx_denied_attempts_time probe per row.
+            _run_migration_step(cursor, "Migrating denied attempts data...", '''
+                CREATE TEMP TABLE legacy_denied_attempts AS
+                SELECT DISTINCT
+                    student_id,
+                    device_info,
+                    reason,
+                    COALESCE(timestamp, strftime('%s', created_at)) as attempted_at
+                FROM denied_attempts
+            ''', '''
+                INSERT INTO denied_attempts
                 (student_id, device_fingerprint_id, reason, attempted_at)
-                SELECT 
+                SELECT
                     da.student_id,
                     df.id as device_fingerprint_id,
                     da.reason,
-                    COALESCE(da.timestamp, strftime('%s', da.created_at)) as attempted_at
-                FROM denied_attempts da
-                LEFT JOIN device_fingerprints df ON 
+                    da.attempted_at
+                FROM legacy_denied_attempts da
+                LEFT JOIN device_fingerprints df ON
                     df.device_info = da.device_info
                 WHERE NOT EXISTS (
-                    SELECT 1 FROM denied_attempts AS new_denied 
-                    WHERE new_denied.attempted_at = COALESCE(da.timestamp, strftime('%s', da.created_at))
+                    SELECT 1 FROM denied_attempts AS new_denied
+                    WHERE new_denied.attempted_at = da.attempted_at
                     AND new_denied.reason = da.reason
                 )
-            ''')
+            ''', 'DROP TABLE legacy_denied_attempts')
             
-            # Migrate tokens data with device fingerprint references
-            print("Migrating tokens data...")
-            cursor.execute('''
-                UPDATE tokens SET device_fingerprint_id = (
-                    SELECT df.id FROM device_fingerprints df 
-                    WHERE df.fingerprint_hash = tokens.device_fingerprint
-                    LIMIT 1
-                ),
-                generated_at = COALESCE(tokens.timestamp, strftime('%s', tokens.created_at))
+            # Migrate tokens data with device fingerprint references: one joined pass
+            # (UPDATE ... FROM, one unique-index probe per token) instead of a correlated subquery
+            _run_migration_step(cursor, "Migrating tokens data...", '''
+                UPDATE tokens SET device_fingerprint_id = df.id
+                FROM device_fingerprints df
+                WHERE df.fingerprint_hash = tokens.device_fingerprint
+            ''', '''
+                UPDATE tokens SET generated_at = COALESCE(tokens.timestamp, strftime('%s', tokens.created_at))
                 WHERE device_fingerprint IS NOT NULL OR tokens.timestamp IS NOT NULL
             ''')
             
             # Create summary data for existing students
-            print("Creating student attendance summaries...")
+            log.info("Creating student attendance summaries...")
             cursor.execute('''
                 INSERT OR REPLACE INTO student_attendance_summary 
                 (student_id, total_sessions, present_count, absent_count, last_check_in, status)
@@ -406,7 +553,7 @@ def migrate_tables():
             ''')
             
             # Create default session profile for migration
-            print("Creating default session profile for migration...")
+            log.info("Creating default session profile for migration...")
             cursor.execute('''
                 INSERT OR IGNORE INTO session_profiles (
                     profile_name, room_type, building, capacity, organizer
@@ -428,78 +575,143 @@ def migrate_tables():
             ''')
             
             # Backup old tables by renaming them
-            print("Backing up old tables...")
+            log.info("Backing up old tables...")
             try:
                 cursor.execute('ALTER TABLE attendances RENAME TO attendances_backup')
                 cursor.execute('ALTER TABLE active_tokens RENAME TO tokens_backup')
-                print("Old tables backed up successfully")
+                log.info("Old tables backed up successfully")
             except Exception as e:
-                print(f"Note: Could not backup old tables (may not exist): {e}")
+                log.warning("Could not backup old tables (may not exist): %s", e)
             
         else:
-            # Fresh installation - just create all tables
-            print("Fresh installation detected - creating all tables...")
-            for table_name, query in TABLES.items():
-                print(f"Creating table: {table_name}")
-                cursor.execute(query)
-            
-            # Create indexes for better performance
-            print("Creating database indexes...")
-            for index_name, index_query in INDEXES.items():
+            # Fresh installation - just create all tables and indexes; the script also opens the transaction
+            log.info("Fresh installation detected - creating all tables...")
+            try:
+                cursor.executescript(f'BEGIN IMMEDIATE;\n{_SCHEMA_TABLES_DDL}\n{_SCHEMA_INDEXES_DDL}')
+            except sqlite3.Error as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                log.warning("Batched schema creation failed (%s), creating objects one by one...", e)
+                cursor.execute('BEGIN IMMEDIATE')
+                for table_name, query in TABLES.items():
+                    log.info("Creating table: %s", table_name)
+                    cursor.execute(query)
+                
+                # Create indexes for better performance
+                log.info("Creating database indexes...")
+                for index_name, index_query in INDEXES.items():
+                    try:
+                        cursor.execute(index_query)
+                    except Exception as e:
+                        log.warning("Could not create index %s: %s", index_name, e)
+
+        for index_name in OBSOLETE_INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+        rebuilt_tables = False
+        for table_name in WITHOUT_ROWID_TABLES:
+            if _rebuild_without_rowid(cursor, table_name):
+                rebuilt_tables = True
+                log.info("Rebuilt %s as a WITHOUT ROWID table", table_name)
+                # Indexes on the old table went with it
+                for index_query in INDEXES.values():
+                    if f' ON {table_name}(' in index_query:
+                        cursor.execute(index_query)
+
+        for table_name, column_name in OBSOLETE_COLUMNS:
+            columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table_name})')]
+            if column_name in columns:
                 try:
-                    cursor.execute(index_query)
-                except Exception as e:
-                    print(f"Note: Could not create index {index_name}: {e}")
-        
-        # Insert default settings if not exists
-        cursor.execute('SELECT * FROM settings WHERE id = ?', ('config',))
-        if not cursor.fetchone():
-            print("Inserting default settings...")
-            cursor.execute('''
-                INSERT INTO settings (
-                    id, max_uses_per_device, time_window_minutes, 
-                    enable_fingerprint_blocking, session_timeout_minutes, max_devices_per_student
-                )
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                'config', 
-                DEFAULT_SETTINGS['max_uses_per_device'], 
-                DEFAULT_SETTINGS['time_window_minutes'], 
-                DEFAULT_SETTINGS['enable_fingerprint_blocking'],
-                30,  # session_timeout_minutes
-                3    # max_devices_per_student
-            ))
+                    cursor.execute(f'ALTER TABLE {table_name} DROP COLUMN {column_name}')
+                except sqlite3.OperationalError as e:
+                    # DROP COLUMN needs SQLite 3.35+; the column is simply left unused otherwise
+                    log.warning("Could not drop column %s.%s: %s", table_name, column_name, e)
+
+        # Summary triggers (created after any data migration so migrated rows aren't counted twice)
+        for trigger_name, trigger_query in TRIGGERS.items():
+            cursor.execute(trigger_query)
+
+        # Insert default settings if not exists (single conditional insert, no lookup first)
+        cursor.execute('''
+            INSERT OR IGNORE INTO settings (
+                id, max_uses_per_device, time_window_minutes,
+                enable_fingerprint_blocking, session_timeout_minutes, max_devices_per_student
+            )
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (
+            'config',
+            DEFAULT_SETTINGS['max_uses_per_device'],
+            DEFAULT_SETTINGS['time_window_minutes'],
+            DEFAULT_SETTINGS['enable_fingerprint_blocking'],
+            30,  # session_timeout_minutes
+            3    # max_devices_per_student
+        ))
+        if cursor.rowcount > 0:
+            log.info("Inserted default settings")
         
         # Create default session profile if none exists
-        cursor.execute('SELECT COUNT(*) FROM session_profiles')
-        profile_count = cursor.fetchone()[0]
-        if profile_count == 0:
-            print("Creating default session profile...")
-            cursor.execute('''
-                INSERT INTO session_profiles (
-                    profile_name, room_type, building, capacity, organizer
-                )
-                VALUES (?, ?, ?, ?, ?)
-            ''', (
-                'Default Session',
-                'Classroom',
-                'Main Building',
-                50,
-                'System Administrator'
-            ))
+        cursor.execute('''
+            INSERT INTO session_profiles (
+                profile_name, room_type, building, capacity, organizer
+            )
+            SELECT ?, ?, ?, ?, ?
+            WHERE NOT EXISTS (SELECT 1 FROM session_profiles)
+        ''', (
+            'Default Session',
+            'Classroom',
+            'Main Building',
+            50,
+            'System Administrator'
+        ))
+        if cursor.rowcount > 0:
+            log.info("Created default session profile")
         
-        conn.commit()
+        cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        cursor.execute('COMMIT')
+
+        if has_old_attendances:
+            # One-off rebuild after the bulk copies; also switches the file to incremental auto-vacuum
+            log.info("Compacting migrated database (VACUUM)...")
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            cursor.execute('VACUUM')
+
+        # Refresh planner statistics (analysis_limit keeps ANALYZE to a bounded sample per index).
+        # A full ANALYZE after bulk changes, schema upgrades (new indexes have no statistics yet) or when
+        # no statistics exist at all (fresh install); otherwise PRAGMA optimize re-analyzes just the stale tables
+        cursor.execute('PRAGMA analysis_limit = 1000')
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+        if has_old_attendances or rebuilt_tables or schema_version < SCHEMA_VERSION or cursor.fetchone() is None:
+            cursor.execute('ANALYZE')
+        else:
+            cursor.execute('PRAGMA optimize')
         conn.close()
         
-        print("Database migrations completed successfully!")
+        log.info("Database migrations completed successfully!")
         return True
         
     except Exception as e:
-        print(f"Error during database migration: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error during database migration: %s", e)
+        if 'conn' in locals() and conn.in_transaction:
+            conn.rollback()
         return False
 
+# Student info, summary counts and attendance percentage in one query. Kept as one constant so
+# every call hits the same entry in the pooled connection's statement cache (prepared once per connection)
+_STUDENT_STATS_SQL = '''
+        SELECT s.student_id, s.name, s.course, s.year,
+               COALESCE(sas.total_sessions, 0) AS total_sessions,
+               COALESCE(sas.present_count, 0) AS present_count,
+               COALESCE(sas.absent_count, 0) AS absent_count,
+               sas.last_check_in,
+               COALESCE(NULLIF(sas.status, ''), 'active') AS status,
+               CASE WHEN sas.total_sessions > 0
+                    THEN COALESCE(sas.present_count, 0) * 100.0 / sas.total_sessions
+                    ELSE 0 END AS attendance_percentage
+        FROM students s
+        LEFT JOIN student_attendance_summary sas ON s.student_id = sas.student_id
+        WHERE s.student_id = ?
+'''
+
 def get_student_attendance_stats(student_id):
     """
     Get comprehensive attendance statistics for a student.
@@ -511,47 +723,13 @@ def get_student_attendance_stats(student_id):
         dict: Student attendance statistics
     """
     try:
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        cursor = conn.cursor()
-        
-        # Get student basic info
-        cursor.execute('''
-            SELECT s.student_id, s.name, s.course, s.year,
-                   sas.total_sessions, sas.present_count, sas.absent_count,
-                   sas.last_check_in, sas.status
-            FROM students s
-            LEFT JOIN student_attendance_summary sas ON s.student_id = sas.student_id
-            WHERE s.student_id = ?
-        ''', (student_id,))
-        
-        result = cursor.fetchone()
-        if not result:
-            conn.close()
-            return None
-            
-        stats = {
-            'student_id': result[0],
-            'name': result[1],
-            'course': result[2],
-            'year': result[3],
-            'total_sessions': result[4] or 0,
-            'present_count': result[5] or 0,
-            'absent_count': result[6] or 0,
-            'last_check_in': result[7],
-            'status': result[8] or 'active'
-        }
+        with pooled_connection(readonly=True) as conn:
+            result = conn.execute(_STUDENT_STATS_SQL, (student_id,)).fetchone()
         
-        # Calculate attendance percentage
-        if stats['total_sessions'] > 0:
-            stats['attendance_percentage'] = (stats['present_count'] / stats['total_sessions']) * 100
-        else:
-            stats['attendance_percentage'] = 0
-            
-        conn.close()
-        return stats
+        return dict(result) if result else None
         
     except Exception as e:
-        print(f"Error getting student attendance stats: {e}")
+        log.error("Error getting student attendance stats: %s", e)
         return None
 
 def update_student_attendance_summary(student_id):
@@ -562,67 +740,106 @@ def update_student_attendance_summary(student_id):
         student_id (str): The student's ID
     """
     try:
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        cursor = conn.cursor()
-        
-        # Calculate current stats
-        cursor.execute('''
-            SELECT 
-                COUNT(DISTINCT ca.session_id) as total_sessions,
-                COUNT(ca.id) as present_count,
-                MAX(ca.checked_in_at) as last_check_in
-            FROM class_attendees ca
-            WHERE ca.student_id = ?
-        ''', (student_id,))
-        
-        stats = cursor.fetchone()
-        if stats:
-            total_sessions, present_count, last_check_in = stats
-            absent_count = max(0, (total_sessions or 0) - (present_count or 0))
-            
-            # Update or insert summary
-            cursor.execute('''
-                INSERT OR REPLACE INTO student_attendance_summary 
+        with pooled_connection() as conn:
+            # Recalculate and upsert the summary in one statement
+            conn.execute('''
+                INSERT INTO student_attendance_summary 
                 (student_id, total_sessions, present_count, absent_count, last_check_in, updated_at)
-                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            ''', (student_id, total_sessions or 0, present_count or 0, absent_count, last_check_in))
+                SELECT ?, COUNT(DISTINCT ca.session_id), COUNT(ca.id),
+                       MAX(0, COUNT(DISTINCT ca.session_id) - COUNT(ca.id)),
+                       MAX(ca.checked_in_at), CURRENT_TIMESTAMP
+                FROM class_attendees ca
+                WHERE ca.student_id = ?
+                ON CONFLICT(student_id) DO UPDATE SET
+                    total_sessions = excluded.total_sessions,
+                    present_count = excluded.present_count,
+                    absent_count = excluded.absent_count,
+                    last_check_in = excluded.last_check_in,
+                    updated_at = excluded.updated_at
+            ''', (student_id, student_id))
             
             conn.commit()
         
-        conn.close()
-        
     except Exception as e:
-        print(f"Error updating student attendance summary: {e}")
+        log.error("Error updating student attendance summary: %s", e)
+
+# The settings row rarely changes, so it is re-read at most once per TTL (shared by
+# operations.get_settings and cleanup_old_tokens); invalidate_settings_cache() expires it
+_SETTINGS_TTL = 60
+_settings_cache = {'value': None, 'expires': 0.0}
+
+def invalidate_settings_cache():
+    """Forget the cached settings (call after the settings row changes)"""
+    _settings_cache['value'] = None
+    _settings_cache['expires'] = 0.0
+
+def load_settings_row():
+    """The settings row as a dict (None if missing), cached in-process for _SETTINGS_TTL seconds"""
+    now = time.time()
+    if now >= _settings_cache['expires']:
+        with pooled_connection(readonly=True) as conn:
+            row = conn.execute('''
+                SELECT max_uses_per_device, time_window_minutes, enable_fingerprint_blocking
+                FROM settings WHERE id = ?
+            ''', ('config',)).fetchone()
+        _settings_cache['value'] = dict(row) if row else None
+        _settings_cache['expires'] = now + _SETTINGS_TTL
+    return _settings_cache['value']
 
 def cleanup_old_tokens():
     """
     Clean up old/expired tokens from the database.
     """
     try:
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        cursor = conn.cursor()
-        
-        # Get time window from settings
-        cursor.execute('SELECT time_window_minutes FROM settings WHERE id = ?', ('config',))
-        result = cursor.fetchone()
-        time_window = result[0] if result else 1440  # Default 24 hours
-        
-        # Calculate cutoff time
-        import time
-        cutoff_time = time.time() - (time_window * 60)
-        
-        # Delete old tokens
-        cursor.execute('DELETE FROM tokens WHERE generated_at < ? AND used = TRUE', (cutoff_time,))
-        deleted_count = cursor.rowcount
-        
-        conn.commit()
-        conn.close()
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            
+            # Get time window from settings
+            settings = load_settings_row()
+            time_window = settings['time_window_minutes'] if settings else 1440  # Default 24 hours
+            
+            # Calculate cutoff time
+            cutoff_time = time.time() - (time_window * 60)
+            
+            # Nothing stale: skip the write transaction entirely
+            cursor.execute('SELECT 1 FROM tokens WHERE used = TRUE AND generated_at < ? LIMIT 1', (cutoff_time,))
+            if cursor.fetchone() is None:
+                return
+
+            # Delete old tokens in batches, committing between them so check-ins can interleave
+            deleted_count = 0
+            while True:
+                cursor.execute('''
+                    DELETE FROM tokens WHERE id IN (
+                        SELECT id FROM tokens WHERE used = TRUE AND generated_at < ? LIMIT ?
+                    )
+                ''', (cutoff_time, TOKEN_CLEANUP_BATCH_SIZE))
+                batch_count = cursor.rowcount
+                conn.commit()
+                deleted_count += batch_count
+                if batch_count < TOKEN_CLEANUP_BATCH_SIZE:
+                    break
         
         if deleted_count > 0:
-            print(f"Cleaned up {deleted_count} old tokens")
+            log.info("Cleaned up %d old tokens", deleted_count)
             
     except Exception as e:
-        print(f"Error cleaning up old tokens: {e}")
+        log.error("Error cleaning up old tokens: %s", e)
+
+# Free pages returned to the OS per maintenance() run (incremental auto-vacuum databases only)
+INCREMENTAL_VACUUM_PAGES = 1000
+
+def maintenance():
+    """
+    Periodic housekeeping: remove stale tokens, then hand a bounded number of free pages back to the OS.
+    """
+    cleanup_old_tokens()
+    try:
+        with pooled_connection() as conn:
+            # executescript steps the pragma to completion (execute() frees a single page)
+            conn.executescript(f'PRAGMA incremental_vacuum({INCREMENTAL_VACUUM_PAGES});')
+    except Exception as e:
+        log.error("Error reclaiming free pages: %s", e)
 
 # Export table names for external use
 TABLE_NAMES = list(TABLES.keys())
@@ -688,22 +905,41 @@ OPTIMIZED_CLASSES_TABLES = {
             effective_until TEXT,      -- End date for this schedule
             FOREIGN KEY (class_id) REFERENCES classes (id) ON DELETE CASCADE
         )
+    ''',
+    
+    # Materialized class_summary rows, kept current by OPTIMIZED_CLASSES_TRIGGERS
+    'class_summary_mat': '''
+        CREATE TABLE IF NOT EXISTS class_summary_mat (
+            class_id INTEGER PRIMARY KEY,
+            class_name TEXT,
+            professor_name TEXT,
+            course_code TEXT,
+            semester TEXT,
+            academic_year TEXT,
+            status TEXT,
+            enrolled_students INTEGER DEFAULT 0,
+            schedule TEXT
+        )
     '''
 }
 
 OPTIMIZED_CLASSES_INDEXES = {
     'idx_classes_professor': 'CREATE INDEX IF NOT EXISTS idx_classes_professor ON classes(professor_name)',
     'idx_classes_status': 'CREATE INDEX IF NOT EXISTS idx_classes_status ON classes(status)',
-    'idx_enrollments_class': 'CREATE INDEX IF NOT EXISTS idx_enrollments_class ON class_enrollments(class_id)',
     'idx_enrollments_student': 'CREATE INDEX IF NOT EXISTS idx_enrollments_student ON class_enrollments(student_id)',
-    'idx_schedules_class': 'CREATE INDEX IF NOT EXISTS idx_schedules_class ON class_schedules(class_id)',
     'idx_schedules_day': 'CREATE INDEX IF NOT EXISTS idx_schedules_day ON class_schedules(day_of_week)',
+    # Composite indexes for the per-class enrolled-student lookups and the class_summary refresh
+    'idx_enrollments_class_status': 'CREATE INDEX IF NOT EXISTS idx_enrollments_class_status ON class_enrollments(class_id, enrollment_status)',
+    'idx_schedules_class_day': 'CREATE INDEX IF NOT EXISTS idx_schedules_class_day ON class_schedules(class_id, day_of_week)',
 }
 
-OPTIMIZED_CLASSES_VIEWS = {
-    'class_summary': '''
-        CREATE VIEW IF NOT EXISTS class_summary AS
-        SELECT 
+# Single-column indexes now covered as left prefixes of the composites above (dropped by the schema script)
+OBSOLETE_CLASSES_INDEXES = ['idx_enrollments_class', 'idx_schedules_class']
+
+# Per-class summary aggregate; {where} narrows it to a single class for the refresh triggers.
+# Grouped by the primary key alone: the other class columns are functionally dependent on c.id
+_CLASS_SUMMARY_SELECT = '''
+        SELECT
             c.id as class_id,
             c.class_name,
             c.professor_name,
@@ -713,13 +949,23 @@ OPTIMIZED_CLASSES_VIEWS = {
             c.status,
             COUNT(ce.student_id) as enrolled_students,
             GROUP_CONCAT(
-                cs.day_of_week || ' ' || cs.start_time || '-' || cs.end_time, 
+                cs.day_of_week || ' ' || cs.start_time || '-' || cs.end_time,
                 '; '
             ) as schedule
         FROM classes c
         LEFT JOIN class_enrollments ce ON c.id = ce.class_id AND ce.enrollment_status = 'enrolled'
         LEFT JOIN class_schedules cs ON c.id = cs.class_id
-        GROUP BY c.id, c.class_name, c.professor_name, c.course_code
+        {where}
+        GROUP BY c.id
+'''
+
+OPTIMIZED_CLASSES_VIEWS = {
+    # Thin view over the materialized rows, so readers keep querying class_summary
+    'class_summary': '''
+        CREATE VIEW IF NOT EXISTS class_summary AS
+        SELECT class_id, class_name, professor_name, course_code, semester, academic_year,
+               status, enrolled_students, schedule
+        FROM class_summary_mat
     ''',
     
     'student_class_details': '''
@@ -738,6 +984,88 @@ OPTIMIZED_CLASSES_VIEWS = {
     '''
 }
 
+def _class_summary_refresh(class_id):
+    """Trigger body statements that recompute one class's class_summary_mat row"""
+    return f'''
+            DELETE FROM class_summary_mat WHERE class_id = {class_id};
+            INSERT INTO class_summary_mat {_CLASS_SUMMARY_SELECT.format(where=f'WHERE c.id = {class_id}').strip()};'''
+
+def _class_summary_trigger(name, event, table, *class_ids):
+    """CREATE TRIGGER statement refreshing class_summary_mat for the given class id expressions"""
+    body = ''.join(_class_summary_refresh(class_id) for class_id in class_ids)
+    return f'''
+        CREATE TRIGGER IF NOT EXISTS {name}
+        AFTER {event} ON {table}
+        BEGIN{body}
+        END
+    '''
+
+# Keep class_summary_mat in step with every write that changes a class's summary row
+OPTIMIZED_CLASSES_TRIGGERS = {
+    'trg_classes_summary_insert': _class_summary_trigger(
+        'trg_classes_summary_insert', 'INSERT', 'classes', 'NEW.id'),
+    'trg_classes_summary_update': _class_summary_trigger(
+        'trg_classes_summary_update',
+        'UPDATE OF class_name, professor_name, course_code, semester, academic_year, status',
+        'classes', 'NEW.id'),
+    'trg_classes_summary_delete': '''
+        CREATE TRIGGER IF NOT EXISTS trg_classes_summary_delete
+        AFTER DELETE ON classes
+        BEGIN
+            DELETE FROM class_summary_mat WHERE class_id = OLD.id;
+        END
+    ''',
+    'trg_enrollments_summary_insert': _class_summary_trigger(
+        'trg_enrollments_summary_insert', 'INSERT', 'class_enrollments', 'NEW.class_id'),
+    'trg_enrollments_summary_update': _class_summary_trigger(
+        'trg_enrollments_summary_update', 'UPDATE OF class_id, student_id, enrollment_status',
+        'class_enrollments', 'OLD.class_id', 'NEW.class_id'),
+    'trg_enrollments_summary_delete': _class_summary_trigger(
+        'trg_enrollments_summary_delete', 'DELETE', 'class_enrollments', 'OLD.class_id'),
+    'trg_schedules_summary_insert': _class_summary_trigger(
+        'trg_schedules_summary_insert', 'INSERT', 'class_schedules', 'NEW.class_id'),
+    'trg_schedules_summary_update': _class_summary_trigger(
+        'trg_schedules_summary_update', 'UPDATE OF class_id, day_of_week, start_time, end_time',
+        'class_schedules', 'OLD.class_id', 'NEW.class_id'),
+    'trg_schedules_summary_delete': _class_summary_trigger(
+        'trg_schedules_summary_delete', 'DELETE', 'class_schedules', 'OLD.class_id'),
+}
+
+# Whole optimized classes schema (tables, indexes, views, triggers) as one script, built once at import
+_OPTIMIZED_CLASSES_SCHEMA_SCRIPT = _join_sql(
+    list(OPTIMIZED_CLASSES_TABLES.values())
+    + list(OPTIMIZED_CLASSES_INDEXES.values())
+    + list(OPTIMIZED_CLASSES_VIEWS.values())
+    + list(OPTIMIZED_CLASSES_TRIGGERS.values())
+    + [f'DROP INDEX IF EXISTS {index_name}' for index_name in OBSOLETE_CLASSES_INDEXES]
+)
+
+# Recompute every class_summary_mat row in one pass
+_CLASS_SUMMARY_REBUILD = (
+    'INSERT OR REPLACE INTO class_summary_mat\n' + textwrap.dedent(_CLASS_SUMMARY_SELECT.format(where='')).strip()
+)
+
+# One-off upgrade for databases created before class_summary was materialized:
+# replace the aggregating view and fill class_summary_mat from the existing rows
+_CLASS_SUMMARY_UPGRADE_SCRIPT = (
+    'DROP VIEW IF EXISTS class_summary;\n'
+    + _OPTIMIZED_CLASSES_SCHEMA_SCRIPT
+    + ';\n' + _CLASS_SUMMARY_REBUILD
+)
+
+# Secondary enrollment indexes and the per-row summary trigger, dropped while
+# migrate_existing_classes_data bulk-loads class_enrollments and recreated afterwards
+_ENROLLMENT_BULK_LOAD_INDEXES = [
+    name for name, query in OPTIMIZED_CLASSES_INDEXES.items() if ' ON class_enrollments(' in query
+]
+_ENROLLMENT_BULK_LOAD_TRIGGER = 'trg_enrollments_summary_insert'
+
+def _fast_pragmas(cursor):
+    """Skip fsyncs for a one-shot classes schema build/migration (cache and temp_store come from _connect)"""
+    # Per-connection only; a crash mid-run is recovered by re-running or from the backup.
+    # journal_mode stays WAL so a failed run can still roll back.
+    cursor.execute('PRAGMA synchronous = OFF')
+
 def create_optimized_classes_schema(db_path=None):
     """
     Create the optimized classes database schema to replace redundant table-per-class approach.
@@ -751,70 +1079,44 @@ def create_optimized_classes_schema(db_path=None):
         db_path = Config.CLASSES_DATABASE_PATH
     
     try:
-        print(f"🔧 Creating optimized classes schema at: {db_path}")
+        log.debug("Creating optimized classes schema at: %s", db_path)
         
         # Ensure the directory exists
         import os
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         
-        conn = sqlite3.connect(db_path)
+        conn = _connect(db_path)
         cursor = conn.cursor()
+        _fast_pragmas(cursor)
         
-        print("Creating optimized classes database schema...")
-        
-        # Create tables
-        for table_name, table_sql in OPTIMIZED_CLASSES_TABLES.items():
-            try:
-                cursor.execute(table_sql)
-                print(f"✅ Created table: {table_name}")
-            except Exception as e:
-                print(f"❌ Failed to create table {table_name}: {e}")
-                raise
-        
-        # Create indexes
-        for index_name, index_sql in OPTIMIZED_CLASSES_INDEXES.items():
-            try:
-                cursor.execute(index_sql)
-                print(f"✅ Created index: {index_name}")
-            except Exception as e:
-                print(f"❌ Failed to create index {index_name}: {e}")
-                raise
-        
-        # Create views
-        for view_name, view_sql in OPTIMIZED_CLASSES_VIEWS.items():
-            try:
-                cursor.execute(view_sql)
-                print(f"✅ Created view: {view_name}")
-            except Exception as e:
-                print(f"❌ Failed to create view {view_name}: {e}")
-                raise
-        
-        conn.commit()
+        # Create tables, indexes, views and triggers in a single script and transaction
+        # (first run on an older database also swaps the class_summary view for the materialized table)
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='class_summary_mat'")
+        schema_script = _OPTIMIZED_CLASSES_SCHEMA_SCRIPT if cursor.fetchone() else _CLASS_SUMMARY_UPGRADE_SCRIPT
+        cursor.executescript(f'BEGIN IMMEDIATE;\n{schema_script};\nCOMMIT;')
+        log.debug("Schema script applied: %d tables, %d indexes, %d views, %d triggers",
+                  len(OPTIMIZED_CLASSES_TABLES), len(OPTIMIZED_CLASSES_INDEXES),
+                  len(OPTIMIZED_CLASSES_VIEWS), len(OPTIMIZED_CLASSES_TRIGGERS))
         
         # Verify that the schema was created properly
-        print("🔍 Verifying schema creation...")
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
         tables = [row[0] for row in cursor.fetchall()]
-        print(f"📋 Created tables: {tables}")
+        log.debug("Classes tables: %s", tables)
         
         cursor.execute("SELECT name FROM sqlite_master WHERE type='view'")
         views = [row[0] for row in cursor.fetchall()]
-        print(f"👁️  Created views: {views}")
+        log.debug("Classes views: %s", views)
         
         # Specifically check for class_summary view
-        if 'class_summary' in views:
-            print("✅ class_summary view verified")
-        else:
-            print("❌ class_summary view not found!")
+        if 'class_summary' not in views:
+            log.error("class_summary view not found")
             return False
         
-        print("✅ Optimized classes schema created successfully!")
+        log.info("Optimized classes schema ready at %s", db_path)
         return True
         
     except Exception as e:
-        print(f"❌ Error creating optimized schema: {e}")
-        import traceback
-        print(f"❌ Full traceback: {traceback.format_exc()}")
+        log.exception("Error creating optimized schema: %s", e)
         if 'conn' in locals():
             conn.rollback()
         return False
@@ -822,14 +1124,45 @@ def create_optimized_classes_schema(db_path=None):
         if 'conn' in locals():
             conn.close()
 
-def migrate_existing_classes_data(old_db_path=None, attendance_db_path=None):
+# Legacy per-class table names that are safe to splice into SQL
+_PLAIN_IDENTIFIER_RE = re.compile(r'[A-Za-z0-9_]+')
+# Tables in the classes database that are not legacy per-class tables
+# (SQLite's own sqlite_* tables, e.g. sqlite_stat1 from ANALYZE / PRAGMA optimize, are excluded separately)
+_NON_LEGACY_CLASS_TABLES = frozenset(OPTIMIZED_CLASSES_TABLES)
+# SQLite's default SQLITE_MAX_COMPOUND_SELECT is 500
+_MAX_UNION_TABLES = 400
+# Legacy table names use underscores for spaces
+_UNDERSCORE_TO_SPACE = str.maketrans('_', ' ')
+
+def drop_tables(conn, tables, vacuum=True):
+    """
+    Drop legacy tables in a single transaction, then VACUUM to reclaim the space.
+    Only plain identifiers are dropped; returns the tables that were removed.
+    """
+    tables = [t for t in tables if _PLAIN_IDENTIFIER_RE.fullmatch(t)]
+    if not tables:
+        return []
+    
+    drop_sql = ";\n".join(f'DROP TABLE IF EXISTS "{t}"' for t in tables)
+    conn.executescript(f"BEGIN;\nPRAGMA defer_foreign_keys = ON;\n{drop_sql};\nCOMMIT;")
+    
+    if vacuum:
+        try:
+            conn.execute('VACUUM')
+        except sqlite3.OperationalError as e:
+            # Another connection is mid-transaction; incremental auto_vacuum will catch up later
+            log.warning("VACUUM skipped: %s", e)
+    return tables
+
+def migrate_existing_classes_data(old_db_path=None, attendance_db_path=None, drop_old=None):
     """
     Migrate existing class tables to the new optimized schema.
     Extracts class and professor information from table names and preserves student enrollments.
+    drop_old decides whether the legacy tables are removed afterwards; None asks on an interactive
+    terminal and otherwise keeps them (so API/scripted callers never block on input()).
     """
     import sqlite3
     import re
-    from datetime import datetime
     
     if old_db_path is None:
         old_db_path = Config.CLASSES_DATABASE_PATH
@@ -837,98 +1170,126 @@ def migrate_existing_classes_data(old_db_path=None, attendance_db_path=None):
         attendance_db_path = Config.DATABASE_PATH
     
     # Create backup first
-    import shutil
-    backup_path = f"{old_db_path}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    shutil.copy2(old_db_path, backup_path)
-    print(f"✅ Backup created: {backup_path}")
+    from database.connection import backup_path_for, backup_database_file
+    backup_path = backup_database_file(old_db_path, backup_path_for(old_db_path))
+    log.info("Backup created: %s", backup_path)
     
-    conn = sqlite3.connect(old_db_path)
+    conn = _connect(old_db_path)
     cursor = conn.cursor()
     
     try:
-        # Get existing class tables (exclude new optimized tables and sqlite_sequence)
-        cursor.execute("""
-            SELECT name FROM sqlite_master 
-            WHERE type='table' AND name != 'sqlite_sequence'
-            AND name NOT IN ('classes', 'class_enrollments', 'professors', 'class_schedules')
-        """)
-        old_tables = [row[0] for row in cursor.fetchall()]
+        # Get existing class tables (exclude new optimized tables and SQLite's internal tables)
+        old_tables = [t for t in list_tables(cursor)
+                      if t not in _NON_LEGACY_CLASS_TABLES and not t.startswith('sqlite_')]
         
         if not old_tables:
-            print("ℹ️  No old class tables found to migrate")
+            log.info("No old class tables found to migrate")
             return True
         
-        print(f"📋 Found {len(old_tables)} class tables to migrate:")
-        for table in old_tables:
-            print(f"   - {table}")
+        log.info("Found %d class tables to migrate", len(old_tables))
+        log.debug("Class tables to migrate: %s", old_tables)
         
-        migrated_count = 0
+        # A crash mid-migration is recovered from the backup above, so skip fsyncs
+        _fast_pragmas(cursor)
+        
+        # One write transaction from the first read to the final commit, so no other writer
+        # can change the legacy tables between reading them and writing the new schema
+        cursor.execute('BEGIN IMMEDIATE')
+        
+        # Table names can't be bound as parameters; only splice plain identifiers
+        skipped_tables = [t for t in old_tables if not _PLAIN_IDENTIFIER_RE.fullmatch(t)]
+        for table in skipped_tables:
+            log.warning("Skipping table with unsupported name: %r", table)
+        old_tables = [t for t in old_tables if _PLAIN_IDENTIFIER_RE.fullmatch(t)]
+        
+        # Read every old table's students in one pass (UNION ALL, chunked below SQLite's compound SELECT limit)
+        students_by_table = defaultdict(list)
+        for i in range(0, len(old_tables), _MAX_UNION_TABLES):
+            union_sql = " UNION ALL ".join(
+                f"SELECT '{t}' AS src, student_id FROM \"{t}\"" for t in old_tables[i:i + _MAX_UNION_TABLES]
+            )
+            for src, student_id in cursor.execute(union_sql):
+                students_by_table[src].append(student_id)
+        
+        # Then write the new schema
+        migrations = []
         for table_name in old_tables:
-            # Extract class name and professor from table name
-            if '___' in table_name:
-                parts = table_name.split('___')
-                class_name = parts[0].replace('_', ' ')
-                professor_name = parts[1].replace('_', ' ') if len(parts) > 1 else 'Unknown Professor'
+            # Extract class name and professor from table name ("<class>___<professor>")
+            class_part, separator, rest = table_name.partition('___')
+            class_name = class_part.translate(_UNDERSCORE_TO_SPACE)
+            if separator:
+                professor_name = rest.partition('___')[0].translate(_UNDERSCORE_TO_SPACE)
             else:
-                class_name = table_name.replace('_', ' ')
                 professor_name = 'Unknown Professor'
             
-            # Get students from this table
-            cursor.execute(f"SELECT student_id FROM {table_name}")
-            student_ids = [row[0] for row in cursor.fetchall()]
+            student_ids = students_by_table.get(table_name)
             
             if student_ids:
-                # Insert professor if not exists
-                cursor.execute("""
-                    INSERT OR IGNORE INTO professors (professor_name, status)
-                    VALUES (?, 'active')
-                """, (professor_name,))
-                
-                # Insert class
-                cursor.execute("""
-                    INSERT OR IGNORE INTO classes 
-                    (class_name, professor_name, status, semester, academic_year)
-                    VALUES (?, ?, 'active', '2025-1', '2024-2025')
-                """, (class_name, professor_name))
-                
-                # Get class ID
-                cursor.execute("""
-                    SELECT id FROM classes 
-                    WHERE class_name = ? AND professor_name = ?
-                """, (class_name, professor_name))
-                result = cursor.fetchone()
-                if result:
-                    class_id = result[0]
-                    
-                    # Insert enrollments
-                    for student_id in student_ids:
-                        cursor.execute("""
-                            INSERT OR IGNORE INTO class_enrollments 
-                            (class_id, student_id, enrollment_status)
-                            VALUES (?, ?, 'enrolled')
-                        """, (class_id, student_id))
-                    
-                    print(f"✅ Migrated: {class_name} - {professor_name} ({len(student_ids)} students)")
-                    migrated_count += 1
+                migrations.append((class_name, professor_name, student_ids))
+        
+        # Insert professors and classes if not exists
+        cursor.executemany("""
+            INSERT OR IGNORE INTO professors (professor_name, status)
+            VALUES (?, 'active')
+        """, {(professor_name,) for _, professor_name, _ in migrations})
+        
+        cursor.executemany("""
+            INSERT OR IGNORE INTO classes
+            (class_name, professor_name, status, semester, academic_year)
+            VALUES (?, ?, 'active', '2025-1', '2024-2025')
+        """, ((class_name, professor_name) for class_name, professor_name, _ in migrations))
+        
+        # Get class IDs (first match per class/professor, as before)
+        class_ids = {}
+        for class_id, class_name, professor_name in cursor.execute(
+                "SELECT id, class_name, professor_name FROM classes ORDER BY id"):
+            class_ids.setdefault((class_name, professor_name), class_id)
+        
+        # Load enrollments without maintaining the secondary indexes / summary row per insert
+        # (the UNIQUE(class_id, student_id) index stays, INSERT OR IGNORE relies on it)
+        for index_name in _ENROLLMENT_BULK_LOAD_INDEXES:
+            cursor.execute(f'DROP INDEX IF EXISTS {index_name}')
+        cursor.execute(f'DROP TRIGGER IF EXISTS {_ENROLLMENT_BULK_LOAD_TRIGGER}')
+        
+        migrated_count = 0
+        for class_name, professor_name, student_ids in migrations:
+            class_id = class_ids.get((class_name, professor_name))
+            if class_id is None:
+                continue
+            
+            # Insert enrollments
+            cursor.executemany("""
+                INSERT OR IGNORE INTO class_enrollments
+                (class_id, student_id, enrollment_status)
+                VALUES (?, ?, 'enrolled')
+            """, ((class_id, student_id) for student_id in student_ids))
+            
+            log.debug("Migrated: %s - %s (%d students)", class_name, professor_name, len(student_ids))
+            migrated_count += 1
+        
+        # Rebuild each deferred index in one sorted pass, then catch the summary up, before committing
+        for index_name in _ENROLLMENT_BULK_LOAD_INDEXES:
+            cursor.execute(OPTIMIZED_CLASSES_INDEXES[index_name])
+        cursor.execute(OPTIMIZED_CLASSES_TRIGGERS[_ENROLLMENT_BULK_LOAD_TRIGGER])
+        cursor.execute(_CLASS_SUMMARY_REBUILD)
         
         conn.commit()
-        print(f"✅ Successfully migrated {migrated_count} classes to optimized schema")
-        
-        # Ask if user wants to remove old tables
-        response = input("\nRemove old redundant tables? (y/N): ").lower()
-        if response == 'y':
-            for table in old_tables:
-                cursor.execute(f"DROP TABLE IF EXISTS {table}")
-                print(f"🗑️  Removed old table: {table}")
-            conn.commit()
-            print("✅ Old tables cleaned up")
+        log.info("Migrated %d classes to optimized schema", migrated_count)
+        
+        # Ask if user wants to remove old tables (only when someone is at a terminal to answer)
+        if drop_old is None and sys.stdin is not None and sys.stdin.isatty():
+            drop_old = input("\nRemove old redundant tables? (y/N): ").lower() == 'y'
+        if drop_old:
+            for table in drop_tables(conn, old_tables):
+                log.debug("Removed old table: %s", table)
+            log.info("Old tables cleaned up")
         else:
-            print("ℹ️  Old tables preserved. You can remove them manually later.")
+            log.info("Old tables preserved. You can remove them manually later.")
         
         return True
         
     except Exception as e:
-        print(f"❌ Migration error: {e}")
+        log.exception("Migration error: %s", e)
         conn.rollback()
         return False
     finally:
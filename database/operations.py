@@ -13,7 +13,8 @@ Main Features:
 - Settings Management: System configuration and security settings
 
 Key Function Categories:
-- Student Operations: get_student_by_id, insert_students, update_student_attendance
+- Student Operations: get_student_by_id, insert_students, insert_students_from_csv, update_student_attendance,
+  update_students_attendance_bulk
 - Session Management: create_attendance_session, stop_active_session, get_active_session
 - Attendance Recording: record_attendance, mark_students_absent, get_students_with_attendance_data
 - Token Operations: create_token, get_token, update_token
@@ -36,34 +37,45 @@ Used by: API routes, web interface controllers, background tasks
 Dependencies: Database connection module, config settings, retry decorators
 """
 
-from .connection import get_db_connection, get_db_connection_with_retry, retry_db_operation
+from .connection import get_db_connection, get_db_connection_with_retry, pooled_connection, retry_db_operation
+from .models import TABLES, invalidate_settings_cache, load_settings_row, maintenance
 from config.config import DEFAULT_SETTINGS
+import atexit
+import csv
+import json
+import queue
+import threading
 import time
-from datetime import datetime
+from functools import lru_cache
+from itertools import islice
 import sqlite3
 
+# Rows per executemany/transaction in bulk imports: bounds memory and WAL growth on very large files
+IMPORT_CHUNK_SIZE = 5000
+
 def row_to_dict(row):
     """Convert sqlite3.Row to dict, return None if row is None"""
     return dict(row) if row else None
 
+def rows_to_dicts(cursor):
+    """Fetch all remaining rows of an executed cursor as dicts (column names read once, not per row)"""
+    columns = [description[0] for description in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
 def get_settings():
-    """Get app settings from database"""
+    """Get app settings from database (the row is cached in-process, see models.load_settings_row)"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM settings WHERE id = ?', ('config',))
-        row = cursor.fetchone()
-        conn.close()
+        row_dict = load_settings_row()
         
-        if row:
-            row_dict = dict(row)  
-            return {
+        if row_dict:
+            settings = {
                 'max_uses_per_device': row_dict['max_uses_per_device'],
                 'time_window_minutes': row_dict['time_window_minutes'],
                 'enable_fingerprint_blocking': bool(row_dict['enable_fingerprint_blocking'])
             }
         else:
-            return DEFAULT_SETTINGS
+            settings = DEFAULT_SETTINGS
+        return settings
     except Exception as e:
         print(f"Error loading settings: {e}")
         return DEFAULT_SETTINGS
@@ -81,32 +93,24 @@ def update_settings(data):
               f"time_window={data.get('time_window_minutes', 1440)}, "
               f"enable_blocking={enable_blocking}")
         
+        # Update the singleton settings row, creating it if missing, in one statement
         cursor.execute('''
-            UPDATE settings 
-            SET max_uses_per_device = ?, time_window_minutes = ?, enable_fingerprint_blocking = ?
-            WHERE id = ?
+            INSERT INTO settings (id, max_uses_per_device, time_window_minutes, enable_fingerprint_blocking)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                max_uses_per_device = excluded.max_uses_per_device,
+                time_window_minutes = excluded.time_window_minutes,
+                enable_fingerprint_blocking = excluded.enable_fingerprint_blocking
         ''', (
-            data.get('max_uses_per_device', 1), 
-            data.get('time_window_minutes', 1440), 
-            enable_blocking, 
-            'config'
+            'config',
+            data.get('max_uses_per_device', 1),
+            data.get('time_window_minutes', 1440),
+            enable_blocking
         ))
         
-        # Verify the update worked
-        if cursor.rowcount == 0:
-            # If no rows were updated, insert the settings
-            cursor.execute('''
-                INSERT OR REPLACE INTO settings (id, max_uses_per_device, time_window_minutes, enable_fingerprint_blocking)
-                VALUES (?, ?, ?, ?)
-            ''', (
-                'config',
-                data.get('max_uses_per_device', 1), 
-                data.get('time_window_minutes', 1440), 
-                enable_blocking
-            ))
-        
         conn.commit()
         conn.close()
+        invalidate_settings_cache()
         print("Settings updated successfully")
         
     except Exception as e:
@@ -126,30 +130,33 @@ def create_token(token, device_fingerprint_id=None):
 
 def get_token(token):
     """Get token data from database"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM tokens WHERE token = ?', (token,))
-    result = cursor.fetchone()
-    conn.close()
+    with pooled_connection(readonly=True) as conn:
+        result = conn.execute('SELECT * FROM tokens WHERE token = ?', (token,)).fetchone()
     return row_to_dict(result) 
 
+# tokens columns update_token() may set
+_TOKEN_UPDATE_COLUMNS = frozenset({'device_fingerprint_id', 'generated_at', 'used', 'opened'})
+
+@lru_cache(maxsize=32)
+def _update_token_sql(columns):
+    """UPDATE statement for a sorted tuple of token columns (same text each time, so the prepared statement is reused)"""
+    invalid = set(columns) - _TOKEN_UPDATE_COLUMNS
+    if invalid:
+        raise ValueError(f"Cannot update token column(s): {', '.join(sorted(invalid))}")
+    return f"UPDATE tokens SET {', '.join(f'{column} = ?' for column in columns)} WHERE token = ?"
+
 def update_token(token, conn=None, **kwargs):
     """Update token with new data. Uses provided conn if given, else opens a new one."""
+    columns = tuple(sorted(kwargs))
+    query = _update_token_sql(columns)
+    values = [kwargs[column] for column in columns]
+    values.append(token)
+    
     close_conn = False
     if conn is None:
         conn = get_db_connection()
         close_conn = True
     cursor = conn.cursor()
-    
-    set_clauses = []
-    values = []
-    for key, value in kwargs.items():
-        set_clauses.append(f"{key} = ?")
-        values.append(value)
-    
-    query = f"UPDATE tokens SET {', '.join(set_clauses)} WHERE token = ?"
-    values.append(token)
-    
     cursor.execute(query, values)
     if close_conn:
         conn.commit()
@@ -164,7 +171,6 @@ def record_attendance(data, conn=None):
             conn = get_db_connection_with_retry()
             close_conn = True
         cursor = conn.cursor()
-        current_time = datetime.now().isoformat()  # Use local time instead of UTC
         
         # Debug: Check if token exists
         token = data.get('token')
@@ -178,17 +184,17 @@ def record_attendance(data, conn=None):
         # First, create or get device fingerprint
         device_fingerprint_id = data.get('device_fingerprint_id')
         
-        # Record attendance
+        # Record attendance (check-in time stamped by SQLite, in local time, to the millisecond;
+        # older rows carry Python's microseconds, which still sort correctly against these as text)
         cursor.execute('''
             INSERT INTO class_attendees 
             (student_id, session_id, token_id, device_fingerprint_id, checked_in_at)
-            VALUES (?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'))
         ''', (
             data.get('student_id'),
             data.get('session_id'),
             token_id,
-            device_fingerprint_id,
-            current_time
+            device_fingerprint_id
         ))
         
         print(f"DEBUG record_attendance: Successfully inserted into class_attendees")
@@ -206,64 +212,146 @@ def record_attendance(data, conn=None):
         if conn and close_conn:
             conn.close()
 
-@retry_db_operation()
+# Denied attempts are queued and written in batches by a background thread (one commit per batch
+# instead of one per request); a batch closes after DENIED_FLUSH_INTERVAL seconds or DENIED_FLUSH_BATCH rows
+DENIED_FLUSH_INTERVAL = 0.1
+DENIED_FLUSH_BATCH = 500
+_denied_queue = queue.Queue()
+_denied_flusher = None
+_denied_flusher_lock = threading.Lock()
+
 def record_denied_attempt(data, reason):
-    """Record denied attempt with device fingerprint reference"""
+    """Queue a denied attempt for the background writer (see flush_denied_attempts)"""
+    _denied_queue.put((dict(data), reason, time.time()))
+    _ensure_denied_flusher()
+
+def _ensure_denied_flusher():
+    """Start the background denied-attempt writer if it is not running"""
+    global _denied_flusher
+    if _denied_flusher is not None and _denied_flusher.is_alive():
+        return
+    with _denied_flusher_lock:
+        if _denied_flusher is None or not _denied_flusher.is_alive():
+            _denied_flusher = threading.Thread(target=_denied_flusher_loop, name='denied-attempts-writer',
+                                               daemon=True)
+            _denied_flusher.start()
+
+def _denied_flusher_loop():
+    while True:
+        batch = [_denied_queue.get()]
+        deadline = time.monotonic() + DENIED_FLUSH_INTERVAL
+        while len(batch) < DENIED_FLUSH_BATCH:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_denied_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        _write_denied_batch(batch)
+
+def _write_denied_batch(batch):
+    """Write a batch taken off the queue, marking it done even if the write fails"""
+    try:
+        _write_denied_attempts(batch)
+    except sqlite3.IntegrityError:
+        # One bad row (e.g. an unknown student_id) must not lose the rest of the batch
+        for item in batch:
+            try:
+                _write_denied_attempts([item])
+            except Exception as e:
+                print(f"Error recording denied attempt: {e}")
+    except Exception as e:
+        print(f"Error recording {len(batch)} denied attempts: {e}")
+    finally:
+        for _ in batch:
+            _denied_queue.task_done()
+
+def flush_denied_attempts():
+    """
+    Write every queued denied attempt now, including a batch the background writer holds.
+    
+    Call before reading or clearing denied_attempts, and outside any open transaction
+    on this thread's connection (the write commits).
+    """
+    batch = []
+    while True:
+        try:
+            batch.append(_denied_queue.get_nowait())
+        except queue.Empty:
+            break
+    if batch:
+        _write_denied_batch(batch)
+    _denied_queue.join()
+
+atexit.register(flush_denied_attempts)
+
+# Set once denied_attempts is known to have session_id, so the PRAGMA runs once per process
+_denied_attempts_has_session_id = False
+
+@retry_db_operation()
+def _write_denied_attempts(batch):
+    """Insert queued (data, reason, attempted_at) denied attempts with device fingerprint references, in one transaction"""
     conn = None
     try:
         conn = get_db_connection_with_retry()
         cursor = conn.cursor()
-        current_time = time.time()
         
         # Check if session_id column exists, add it if not
-        try:
-            cursor.execute("PRAGMA table_info(denied_attempts)")
-            columns = [row[1] for row in cursor.fetchall()]
-            if 'session_id' not in columns:
-                cursor.execute("ALTER TABLE denied_attempts ADD COLUMN session_id INTEGER")
-                print("Added session_id column to denied_attempts table")
-        except Exception as e:
-            print(f"Note: Could not add session_id column (may already exist): {e}")
+        global _denied_attempts_has_session_id
+        if not _denied_attempts_has_session_id:
+            try:
+                cursor.execute("PRAGMA table_info(denied_attempts)")
+                columns = [row[1] for row in cursor.fetchall()]
+                if 'session_id' not in columns:
+                    cursor.execute("ALTER TABLE denied_attempts ADD COLUMN session_id INTEGER")
+                    print("Added session_id column to denied_attempts table")
+                else:
+                    # Only cached once the column is committed schema, not added in this transaction
+                    _denied_attempts_has_session_id = True
+            except Exception as e:
+                print(f"Note: Could not add session_id column (may already exist): {e}")
         
-        # First, create or get device fingerprint
-        device_fingerprint_id = None
-        if data.get('fingerprint_hash') or data.get('device_info'):
-            cursor.execute('''
-                INSERT OR IGNORE INTO device_fingerprints 
-                (fingerprint_hash, first_seen, last_seen, usage_count, device_info, is_blocked)
-                VALUES (?, ?, ?, 1, ?, FALSE)
-            ''', (
-                data.get('fingerprint_hash', 'unknown'),
-                datetime.utcnow().isoformat(),
-                datetime.utcnow().isoformat(),
-                data.get('device_info')
-            ))
-            
-            # Get the device fingerprint ID
-            cursor.execute('''
-                SELECT id FROM device_fingerprints 
-                WHERE fingerprint_hash = ? AND (device_info = ? OR (device_info IS NULL AND ? IS NULL))
-            ''', (
-                data.get('fingerprint_hash', 'unknown'),
-                data.get('device_info'),
-                data.get('device_info')
+        rows = []
+        for data, reason, attempted_at in batch:
+            # First, create or get device fingerprint
+            device_fingerprint_id = None
+            if data.get('fingerprint_hash') or data.get('device_info'):
+                cursor.execute('''
+                    INSERT OR IGNORE INTO device_fingerprints 
+                    (fingerprint_hash, first_seen, last_seen, usage_count, device_info, is_blocked)
+                    VALUES (?, strftime('%Y-%m-%dT%H:%M:%f', 'now'), strftime('%Y-%m-%dT%H:%M:%f', 'now'), 1, ?, FALSE)
+                ''', (
+                    data.get('fingerprint_hash', 'unknown'),
+                    data.get('device_info')
+                ))
+                
+                # Get the device fingerprint ID
+                cursor.execute('''
+                    SELECT id FROM device_fingerprints 
+                    WHERE fingerprint_hash = ? AND (device_info = ? OR (device_info IS NULL AND ? IS NULL))
+                ''', (
+                    data.get('fingerprint_hash', 'unknown'),
+                    data.get('device_info'),
+                    data.get('device_info')
+                ))
+                result = cursor.fetchone()
+                if result:
+                    device_fingerprint_id = result[0]
+            rows.append((
+                data.get('student_id'),
+                data.get('token_id'),
+                device_fingerprint_id,
+                reason,
+                attempted_at,
+                data.get('session_id')
             ))
-            result = cursor.fetchone()
-            if result:
-                device_fingerprint_id = result[0]
         
-        cursor.execute('''
+        cursor.executemany('''
             INSERT INTO denied_attempts 
             (student_id, token_id, device_fingerprint_id, reason, attempted_at, session_id)
             VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            data.get('student_id'),
-            data.get('token_id'),
-            device_fingerprint_id,
-            reason,
-            current_time,
-            data.get('session_id')
-        ))
+        ''', rows)
         
         conn.commit()
     except Exception as e:
@@ -274,27 +362,49 @@ def record_denied_attempt(data, reason):
         if conn:
             conn.close()
 
-def get_all_data(table_name, limit=100):
-    """Get all data from specified table"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+# Newest-first ordering key per table for get_all_data: the timestamp column, then the primary key
+# so that rows sharing a timestamp still have a strict order (tables not listed order by id)
+_PAGE_ORDER_COLUMNS = {
+    'device_fingerprints': ('last_seen', 'id'),
+    'class_attendees': ('checked_in_at', 'id'),
+    'denied_attempts': ('attempted_at', 'id'),
+    'tokens': ('generated_at', 'id'),
+    'attendance_sessions': ('created_at', 'id'),
+    'session_profiles': ('created_at', 'id'),
+    'student_attendance_summary': ('updated_at', 'student_id'),
+    'session_enrollments': ('enrolled_at', 'profile_id', 'student_id'),
+    'settings': ('id',)
+}
+
+def get_all_data(table_name, limit=100, before=None):
+    """
+    Get all data from specified table, newest first.
     
-    timestamp_columns = {
-        'device_fingerprints': 'last_seen',
-        'class_attendees': 'checked_in_at',
-        'denied_attempts': 'attempted_at',
-        'tokens': 'generated_at',
-        'attendance_sessions': 'created_at',
-        'session_profiles': 'created_at',
-        'student_attendance_summary': 'updated_at',
-        'settings': 'id'
-    }
+    Pass the last row of the previous page as before= to fetch the next page
+    (keyset pagination on the table's ordering key: the index seeks straight to that row
+    instead of skipping earlier ones, and rows sharing its timestamp are not lost).
+    """
+    if table_name not in TABLES:
+        raise ValueError(f"Unknown table: {table_name}")
+    order_columns = _PAGE_ORDER_COLUMNS.get(table_name, ('id',))
+    order_by = ', '.join(f'{column} DESC' for column in order_columns)
+    if table_name == 'denied_attempts':
+        flush_denied_attempts()
     
-    order_column = timestamp_columns.get(table_name, 'id') 
-    cursor.execute(f'SELECT * FROM {table_name} ORDER BY {order_column} DESC LIMIT ?', (limit,))
-    rows = cursor.fetchall()
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    if before is None:
+        cursor.execute(f'SELECT * FROM {table_name} ORDER BY {order_by} LIMIT ?', (limit,))
+    else:
+        # Row-value comparison: strictly after the last row seen in (timestamp, key) order
+        key_columns = ', '.join(order_columns)
+        placeholders = ', '.join('?' * len(order_columns))
+        cursor.execute(f'SELECT * FROM {table_name} WHERE ({key_columns}) < ({placeholders}) '
+                       f'ORDER BY {order_by} LIMIT ?',
+                       (*(before[column] for column in order_columns), limit))
+    rows = rows_to_dicts(cursor)
     conn.close()
-    return [dict(row) for row in rows]
+    return rows
 
 def get_attendance_records_with_details(limit=100):
     """Get attendance records with student details, device info, and token info - only for active session"""
@@ -344,65 +454,104 @@ def get_attendance_records_with_details(limit=100):
         conn.close()
         return []
 
-def insert_students(rows):
-    """Insert students from CSV/Excel data"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    count = 0
-    
+def _student_params(rows):
+    """Yield (student_id, name, course, year) tuples from CSV/Excel rows, skipping malformed ones"""
     for row in rows:
         if len(row) >= 4:  # student_id, name, course, year
             try:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO students (student_id, name, course, year)
-                    VALUES (?, ?, ?, ?)
-                ''', (
+                yield (
                     str(row[0]).strip(),  # student_id
                     str(row[1]).strip(),  # name
                     str(row[2]).strip(),  # course
                     int(row[3])           # year
-                ))
-                count += 1
-            except Exception:
+                )
+            except (TypeError, ValueError):
                 continue
+
+def insert_students(rows):
+    """Insert students from CSV/Excel data"""
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    params = _student_params(rows)
+    count = 0
     
-    conn.commit()
-    conn.close()
+    try:
+        # Stream the rows in IMPORT_CHUNK_SIZE batches, one executemany and transaction each.
+        # Upsert rather than INSERT OR REPLACE: REPLACE deletes the old row first, which
+        # cascades to the student's class_attendees/enrollment rows
+        while True:
+            chunk = list(islice(params, IMPORT_CHUNK_SIZE))
+            if not chunk:
+                break
+            cursor.executemany('''
+                INSERT INTO students (student_id, name, course, year)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(student_id) DO UPDATE SET
+                    name = excluded.name,
+                    course = excluded.course,
+                    year = excluded.year,
+                    updated_at = CURRENT_TIMESTAMP
+            ''', chunk)
+            conn.commit()
+            count += len(chunk)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
     return count
 
+def insert_students_from_csv(path, has_header=True):
+    """
+    Bulk-load a trusted student_id,name,course,year CSV file.
+    
+    Rows stream straight from the file into insert_students' chunked executemany,
+    so even very large rosters are never held in memory as a whole.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as csv_file:
+        reader = csv.reader(csv_file)
+        if has_header:
+            next(reader, None)
+        return insert_students(reader)
 
 def get_all_students():
     """Get all students from database"""
     conn = get_db_connection()
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM students ORDER BY name')
-    rows = cursor.fetchall()
+    rows = rows_to_dicts(cursor)
     conn.close()
-    return [dict(row) for row in rows]
+    return rows
 
 def clear_all_students():
     """Clear all students from database"""
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute('SELECT COUNT(*) FROM students')
-    count = cursor.fetchone()[0]
+    # rowcount counts only the student rows (not the FK cascade deletes), so no separate COUNT(*) pass
     cursor.execute('DELETE FROM students')
+    count = cursor.rowcount
     conn.commit()
     conn.close()
     return count
 
 def get_student_by_id(student_id):
     """Get student by student ID"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute('SELECT * FROM students WHERE student_id = ?', (student_id,))
-    result = cursor.fetchone()
-    conn.close()
+    with pooled_connection(readonly=True) as conn:
+        result = conn.execute('SELECT * FROM students WHERE student_id = ?', (student_id,)).fetchone()
     return dict(result) if result else None
 
-@retry_db_operation()
 def update_student_attendance(student_id, status, conn=None):
     """Update student attendance status using new normalized schema. Uses provided conn if given, else opens a new one."""
+    update_students_attendance_bulk([(student_id, status)], conn=conn)
+
+@retry_db_operation()
+def update_students_attendance_bulk(items, conn=None):
+    """
+    Apply many (student_id, status) attendance updates against the active session.
+    
+    Looks the session up once and writes each status group with a single executemany
+    in one transaction. Uses provided conn if given, else opens a new one.
+    """
     close_conn = False
     try:
         if conn is None:
@@ -413,72 +562,47 @@ def update_student_attendance(student_id, status, conn=None):
         cursor.execute('SELECT id FROM attendance_sessions WHERE is_active = 1 LIMIT 1')
         session = cursor.fetchone()
         session_id = session[0] if session else None
-        if status == 'present' and session_id:
-            # Record attendance in class_attendees table
-            current_time = datetime.now().isoformat()  # Use local time instead of UTC
-            cursor.execute('''
-                INSERT OR IGNORE INTO class_attendees 
-                (student_id, session_id, checked_in_at)
-                VALUES (?, ?, ?)
-            ''', (student_id, session_id, current_time))
-            # Update student attendance summary
-            cursor.execute('''
-                INSERT OR REPLACE INTO student_attendance_summary 
-                (student_id, total_sessions, present_count, late_count, absent_count, last_session_id, last_check_in, status, updated_at)
-                SELECT 
-                    ?, 
-                    COALESCE((SELECT total_sessions FROM student_attendance_summary WHERE student_id = ?), 0) + 1,
-                    COALESCE((SELECT present_count FROM student_attendance_summary WHERE student_id = ?), 0) + 1,
-                    COALESCE((SELECT late_count FROM student_attendance_summary WHERE student_id = ?), 0),
-                    COALESCE((SELECT absent_count FROM student_attendance_summary WHERE student_id = ?), 0),
-                    ?, 
-                    ?,
-                    'present',
-                    datetime('now')
-            ''', (student_id, student_id, student_id, student_id, student_id, session_id, current_time))
-            print(f"Updated {student_id} as present for session {session_id}")
-        elif status == 'late' and session_id:
-            # Record attendance in class_attendees table (same as present)
-            current_time = datetime.now().isoformat()  # Use local time instead of UTC
-            cursor.execute('''
+        if session_id is None:
+            return 0
+        
+        checked_in = [student_id for student_id, status in items if status in ('present', 'late')]
+        late = [student_id for student_id, status in items if status == 'late']
+        absent = [student_id for student_id, status in items if status == 'absent']
+        
+        if checked_in:
+            # Record attendance in class_attendees table (check-in time stamped by SQLite, in local time)
+            cursor.executemany('''
                 INSERT OR IGNORE INTO class_attendees 
                 (student_id, session_id, checked_in_at)
-                VALUES (?, ?, ?)
-            ''', (student_id, session_id, current_time))
-            # Update student attendance summary for late
-            cursor.execute('''
-                INSERT OR REPLACE INTO student_attendance_summary 
-                (student_id, total_sessions, present_count, late_count, absent_count, last_session_id, last_check_in, status, updated_at)
-                SELECT 
-                    ?, 
-                    COALESCE((SELECT total_sessions FROM student_attendance_summary WHERE student_id = ?), 0) + 1,
-                    COALESCE((SELECT present_count FROM student_attendance_summary WHERE student_id = ?), 0),
-                    COALESCE((SELECT late_count FROM student_attendance_summary WHERE student_id = ?), 0) + 1,
-                    COALESCE((SELECT absent_count FROM student_attendance_summary WHERE student_id = ?), 0),
-                    ?, 
-                    ?,
-                    'late',
-                    datetime('now')
-            ''', (student_id, student_id, student_id, student_id, student_id, session_id, current_time))
-            print(f"Updated {student_id} as late for session {session_id}")
-        elif status == 'absent' and session_id:
+                VALUES (?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now', 'localtime'))
+            ''', ((student_id, session_id) for student_id in checked_in))
+            # The class_attendees insert trigger counts each check-in in student_attendance_summary
+        if late:
+            # The insert trigger counted these check-ins as present; move them to late
+            cursor.executemany('''
+                UPDATE student_attendance_summary
+                SET present_count = present_count - 1, late_count = late_count + 1,
+                    status = 'late', updated_at = datetime('now')
+                WHERE student_id = ? AND last_session_id = ? AND status = 'present'
+            ''', ((student_id, session_id) for student_id in late))
+        if absent:
             # Update student attendance summary for absent
-            cursor.execute('''
-                INSERT OR REPLACE INTO student_attendance_summary 
-                (student_id, total_sessions, present_count, late_count, absent_count, last_session_id, status, updated_at)
-                SELECT 
-                    ?, 
-                    COALESCE((SELECT total_sessions FROM student_attendance_summary WHERE student_id = ?), 0) + 1,
-                    COALESCE((SELECT present_count FROM student_attendance_summary WHERE student_id = ?), 0),
-                    COALESCE((SELECT late_count FROM student_attendance_summary WHERE student_id = ?), 0),
-                    COALESCE((SELECT absent_count FROM student_attendance_summary WHERE student_id = ?), 0) + 1,
-                    ?,
-                    'absent',
-                    datetime('now')
-            ''', (student_id, student_id, student_id, student_id, student_id, session_id))
-            print(f"Updated {student_id} as absent for session {session_id}")
+            cursor.executemany('''
+                INSERT INTO student_attendance_summary
+                    (student_id, total_sessions, absent_count, last_session_id, status, updated_at)
+                VALUES (?, 1, 1, ?, 'absent', datetime('now'))
+                ON CONFLICT(student_id) DO UPDATE SET
+                    total_sessions = total_sessions + 1,
+                    absent_count = absent_count + 1,
+                    last_session_id = excluded.last_session_id,
+                    status = 'absent',
+                    updated_at = excluded.updated_at
+            ''', ((student_id, session_id) for student_id in absent))
+        
+        print(f"Updated attendance for {len(checked_in) + len(absent)} students in session {session_id}")
         if close_conn:
             conn.commit()
+        return len(checked_in) + len(absent)
     except Exception as e:
         if conn and close_conn:
             conn.rollback()
@@ -487,7 +611,6 @@ def update_student_attendance(student_id, status, conn=None):
         if conn and close_conn:
             conn.close()
 
-            
 @retry_db_operation()
 def mark_students_absent(session_id=None, cursor=None):
     """Mark students as absent if they didn't check in during active session.
@@ -501,8 +624,6 @@ def mark_students_absent(session_id=None, cursor=None):
             cursor.execute('SELECT id, class_table, profile_id FROM attendance_sessions WHERE is_active = 1')
             session = cursor.fetchone()
             if not session:
-                if conn:
-                    conn.close()
                 return 0
             session_id, class_table, profile_id = session
         else:
@@ -512,68 +633,48 @@ def mark_students_absent(session_id=None, cursor=None):
                 class_table, profile_id = session_row
             else:
                 class_table, profile_id = None, None
-        absent_count = 0
         # --- Optimized class-based session logic ---
         if class_table is not None and str(class_table).strip().isdigit():
             print(f"Session created for class_id {class_table}, only marking enrolled class students as absent")
             from database.class_table_manager import OptimizedClassManager
             manager = OptimizedClassManager()
             class_id = int(class_table)
-            enrolled_students = manager.get_class_students(class_id)
-            enrolled_student_ids = [student['student_id'] for student in enrolled_students]
-            print(f"[DEBUG] Enrolled students for class {class_id}: {enrolled_student_ids}")
-            cursor.execute('SELECT student_id FROM class_attendees WHERE session_id = ?', (session_id,))
-            checked_in_students = {row[0] for row in cursor.fetchall()}
-            print(f"[DEBUG] Checked-in students for session {session_id}: {checked_in_students}")
-            for student_id in enrolled_student_ids:
-                if student_id not in checked_in_students:
-                    print(f"[DEBUG] Marking {student_id} as absent (class)")
-                    update_student_attendance(student_id, 'absent')
-                    absent_count += 1
+            # Enrollments live in classes.db, so the roster is passed in as a JSON array
+            enrolled_student_ids = manager.get_enrolled_student_ids(class_id)
+            candidates = 's.student_id IN (SELECT value FROM json_each(?))'
+            candidate_params = (json.dumps(enrolled_student_ids),)
         # --- Session profile logic ---
         elif profile_id:
             print(f"Session created from profile {profile_id}, only marking enrolled students as absent")
-            cursor.execute('''
-                SELECT se.student_id 
-                FROM session_enrollments se 
-                JOIN students s ON se.student_id = s.student_id 
-                WHERE se.profile_id = ?
-            ''', (profile_id,))
-            enrolled_student_ids = [row[0] for row in cursor.fetchall()]
-            print(f"[DEBUG] Enrolled students for profile {profile_id}: {enrolled_student_ids}")
-            cursor.execute('SELECT student_id FROM class_attendees WHERE session_id = ?', (session_id,))
-            checked_in_students = {row[0] for row in cursor.fetchall()}
-            print(f"[DEBUG] Checked-in students for session {session_id}: {checked_in_students}")
-            for student_id in enrolled_student_ids:
-                if student_id not in checked_in_students:
-                    print(f"[DEBUG] Marking {student_id} as absent (profile)")
-                    update_student_attendance(student_id, 'absent')
-                    absent_count += 1
+            candidates = 's.student_id IN (SELECT student_id FROM session_enrollments WHERE profile_id = ?)'
+            candidate_params = (profile_id,)
         # --- Course/legacy/general logic ---
         elif class_table:  # Course-specific session: only mark students from that course
-            cursor.execute('SELECT student_id FROM students WHERE course = ?', (class_table,))
-            course_student_ids = [row[0] for row in cursor.fetchall()]
-            print(f"[DEBUG] Students in course '{class_table}': {course_student_ids}")
-            cursor.execute('SELECT student_id FROM class_attendees WHERE session_id = ?', (session_id,))
-            checked_in_students = {row[0] for row in cursor.fetchall()}
-            print(f"[DEBUG] Checked-in students for session {session_id}: {checked_in_students}")
-            for student_id in course_student_ids:
-                if student_id not in checked_in_students:
-                    print(f"[DEBUG] Marking {student_id} as absent (course)")
-                    update_student_attendance(student_id, 'absent')
-                    absent_count += 1
+            candidates = 's.course = ?'
+            candidate_params = (class_table,)
         else:  # General session: mark all students who didn't check in
-            cursor.execute('SELECT student_id FROM students')
-            all_student_ids = [row[0] for row in cursor.fetchall()]
-            print(f"[DEBUG] All students: {all_student_ids}")
-            cursor.execute('SELECT student_id FROM class_attendees WHERE session_id = ?', (session_id,))
-            checked_in_students = {row[0] for row in cursor.fetchall()}
-            print(f"[DEBUG] Checked-in students for session {session_id}: {checked_in_students}")
-            for student_id in all_student_ids:
-                if student_id not in checked_in_students:
-                    print(f"[DEBUG] Marking {student_id} as absent (general)")
-                    update_student_attendance(student_id, 'absent')
-                    absent_count += 1
+            candidates = '1'
+            candidate_params = ()
+        
+        # Count one absence for every candidate without a check-in, in a single statement
+        cursor.execute(f'''
+            INSERT INTO student_attendance_summary
+                (student_id, total_sessions, absent_count, last_session_id, status, updated_at)
+            SELECT s.student_id, 1, 1, ?, 'absent', datetime('now')
+            FROM students s
+            WHERE {candidates}
+              AND NOT EXISTS (
+                  SELECT 1 FROM class_attendees ca
+                  WHERE ca.session_id = ? AND ca.student_id = s.student_id
+              )
+            ON CONFLICT(student_id) DO UPDATE SET
+                total_sessions = total_sessions + 1,
+                absent_count = absent_count + 1,
+                last_session_id = excluded.last_session_id,
+                status = 'absent',
+                updated_at = excluded.updated_at
+        ''', (session_id, *candidate_params, session_id))
+        absent_count = cursor.rowcount
         if conn:
             conn.commit()
         print(f"Marked {absent_count} students as absent for session {session_id}")
@@ -590,8 +691,22 @@ def mark_students_absent(session_id=None, cursor=None):
             conn.close()
 
 
+# get_active_session() result (including "no session"), reused for _ACTIVE_SESSION_TTL seconds.
+# Session writes here expire it at once; the TTL bounds how late a start/end time takes effect.
+_ACTIVE_SESSION_TTL = 5
+_active_session_cache = {'row': None, 'expires': 0.0}
+
+def invalidate_active_session_cache():
+    """Forget the cached active session (call after attendance_sessions changes)"""
+    _active_session_cache['expires'] = 0.0
+
 def get_active_session():
     """Get the currently active attendance session"""
+    now = time.time()
+    if now < _active_session_cache['expires']:
+        row = _active_session_cache['row']
+        return dict(row) if row else None
+    
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
@@ -604,7 +719,10 @@ def get_active_session():
         ''')
         result = cursor.fetchone()
         conn.close()
-        return row_to_dict(result)
+        session = row_to_dict(result)
+        _active_session_cache['row'] = session
+        _active_session_cache['expires'] = now + _ACTIVE_SESSION_TTL
+        return dict(session) if session else None
     except Exception:
         return None
 
@@ -613,6 +731,7 @@ def create_attendance_session(session_name, start_time, end_time, profile_id=Non
     For optimized class-based sessions, class_table must be a valid integer class ID.
     For legacy/old sessions, class_table may be a course name or None.
     """
+    invalidate_active_session_cache()
     try:
         # Reset all student attendance status to null before creating a new session
         conn = get_db_connection()
@@ -640,6 +759,7 @@ def create_attendance_session(session_name, start_time, end_time, profile_id=Non
             ''', (profile_id, session_name, start_time, end_time, late_minutes, class_id))
             conn.commit()
             conn.close()
+            invalidate_active_session_cache()
             print(f"[Optimized] Created attendance session: {session_name} for class_id: {class_id}")
             return True
         # --- Legacy/old session logic ---
@@ -652,6 +772,7 @@ def create_attendance_session(session_name, start_time, end_time, profile_id=Non
             ''', (profile_id, session_name, start_time, end_time, late_minutes, legacy_value))
             conn.commit()
             conn.close()
+            invalidate_active_session_cache()
             print(f"[Legacy] Created attendance session: {session_name} for course: {legacy_value}")
             return True
         else:
@@ -668,6 +789,8 @@ def stop_active_session():
     """Stop the currently active attendance session and mark absent students"""
     conn = None
     try:
+        # Queued denied attempts belong to this session, so write them before it is cleared
+        flush_denied_attempts()
         conn = get_db_connection_with_retry()
         cursor = conn.cursor()
         
@@ -688,22 +811,23 @@ def stop_active_session():
                 WHERE is_active = 1
             ''')
             
-            # Get counts before clearing for the response
-            cursor.execute('SELECT COUNT(*) FROM class_attendees')
-            attendance_count = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM denied_attempts')
-            denied_count = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(*) FROM device_fingerprints')
-            device_count = cursor.fetchone()[0]
+            # Get counts for the response in one query (neither table is touched by the clean-up below)
+            cursor.execute('''
+                SELECT (SELECT COUNT(*) FROM class_attendees), (SELECT COUNT(*) FROM device_fingerprints)
+            ''')
+            attendance_count, device_count = cursor.fetchone()
             
             # Clear session-specific data when session ends (but preserve attendance records)
             # Note: Keep class_attendees records for historical attendance data
             cursor.execute('DELETE FROM denied_attempts')
+            denied_count = cursor.rowcount
             cursor.execute('DELETE FROM tokens WHERE used = TRUE')
             
             conn.commit()
+            invalidate_active_session_cache()
+            
+            # Session end is when most rows are deleted: drop stale tokens and reclaim free pages
+            maintenance()
             
             return {
                 'success': True, 
@@ -750,14 +874,10 @@ def get_students_with_attendance_data():
             ORDER BY s.name
         ''')
         
-        results = cursor.fetchall()
-        
-        students = []
-        for row in results:
-            student_dict = row_to_dict(row)
+        students = rows_to_dicts(cursor)
+        for student_dict in students:
             if not student_dict.get('status'):
                 student_dict['status'] = None
-            students.append(student_dict)
         
         return students
         
@@ -829,6 +949,7 @@ def delete_session_profile(profile_id):
         cursor.execute('DELETE FROM session_profiles WHERE id = ?', (profile_id,))
         
         conn.commit()
+        invalidate_active_session_cache()  # the profile's sessions went with it
         affected_rows = cursor.rowcount
         conn.close()
         return affected_rows > 0
@@ -926,14 +1047,13 @@ def get_available_students_for_enrollment(profile_id):
         conn = get_db_connection()
         cursor = conn.cursor()
         
+        # Anti-join: one index probe into session_enrollments per student
         cursor.execute('''
             SELECT s.student_id, s.name, s.course, s.year
             FROM students s
-            WHERE s.student_id NOT IN (
-                SELECT se.student_id 
-                FROM session_enrollments se 
-                WHERE se.profile_id = ?
-            )
+            LEFT JOIN session_enrollments se
+                ON se.profile_id = ? AND se.student_id = s.student_id
+            WHERE se.student_id IS NULL
             ORDER BY s.name
         ''', (profile_id,))
         
@@ -1099,6 +1219,7 @@ def is_device_already_checked_in_session(fingerprint_hash, session_id):
 
 def get_denied_attempts_with_details(limit=100):
     """Get denied attempts with student details, device info, and token info"""
+    flush_denied_attempts()
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -16,10 +16,9 @@ Used for resolving schema inconsistencies and ensuring data integrity.
 
 import sqlite3
 import os
-import shutil
-from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 from config.config import Config
+from database.connection import backup_path_for, backup_database_file
 
 class SchemaManager:
     """Manages database schema migrations and cleanup"""
@@ -27,7 +26,15 @@ class SchemaManager:
     def __init__(self, db_path: str = None):
         self.db_path = db_path or Config.DATABASE_PATH
         self.classes_db_path = Config.CLASSES_DATABASE_PATH
-        
+        self._table_names = None
+    
+    def _get_table_names(self, cursor) -> List[str]:
+        """Table names, read once and reused until the schema is changed through this manager"""
+        if self._table_names is None:
+            from database.models import list_tables
+            self._table_names = list_tables(cursor)
+        return self._table_names
+    
     def validate_schema(self) -> Dict[str, any]:
         """Validate current database schema and identify issues"""
         issues = {
@@ -49,8 +56,7 @@ class SchemaManager:
                 'device_fingerprints', 'student_attendance_summary', 'settings'
             ]
             
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-            existing_tables = [row[0] for row in cursor.fetchall()]
+            existing_tables = self._get_table_names(cursor)
             
             for table in required_tables:
                 if table not in existing_tables:
@@ -68,7 +74,7 @@ class SchemaManager:
             
             # Check for redundant class tables
             class_tables = [t for t in existing_tables if '___' in t or 
-                          (t not in required_tables and t != 'sqlite_sequence')]
+                          (t not in required_tables and not t.startswith('sqlite_'))]
             issues['redundant_data'] = class_tables
             
             conn.close()
@@ -112,7 +118,6 @@ class SchemaManager:
                 self._create_backup()
             
             conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
             
             # Get validation results
             issues = self.validate_schema()
@@ -120,9 +125,9 @@ class SchemaManager:
             print("🧹 Cleaning up old schema...")
             
             # Remove orphaned tables
-            for table in issues['orphaned_tables']:
+            tables_to_drop = list(issues['orphaned_tables'])
+            for table in tables_to_drop:
                 print(f"  - Removing orphaned table: {table}")
-                cursor.execute(f"DROP TABLE IF EXISTS {table}")
             
             # Clean up redundant class tables
             if issues['redundant_data']:
@@ -131,9 +136,14 @@ class SchemaManager:
                 if response == 'y':
                     for table in issues['redundant_data']:
                         print(f"    - Removing: {table}")
-                        cursor.execute(f"DROP TABLE IF EXISTS {table}")
-            
-            conn.commit()
+                    tables_to_drop.extend(issues['redundant_data'])
+            
+            # One transaction for all drops, then a single VACUUM
+            from database.models import drop_tables
+            dropped = drop_tables(conn, tables_to_drop)
+            self._table_names = None
+            for table in set(tables_to_drop) - set(dropped):
+                print(f"  - Skipped table with unsupported name: {table!r}")
             conn.close()
             
             print("✅ Schema cleanup completed")
@@ -175,6 +185,7 @@ class SchemaManager:
             
             # Validate final schema
             print("✅ Validating migrated schema...")
+            self._table_names = None
             issues = self.validate_schema()
             if issues['missing_tables'] or issues['missing_foreign_keys']:
                 print(f"⚠️  Migration completed with issues: {issues}")
@@ -224,11 +235,8 @@ class SchemaManager:
     
     def _create_backup(self) -> str:
         """Create database backup"""
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_path = f"{self.db_path}.backup_{timestamp}"
-        
         try:
-            shutil.copy2(self.db_path, backup_path)
+            backup_path = backup_database_file(self.db_path, backup_path_for(self.db_path))
             print(f"📦 Backup created: {backup_path}")
             return backup_path
         except Exception as e:
@@ -250,8 +258,7 @@ class SchemaManager:
             cursor = conn.cursor()
             
             # Count tables
-            cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type='table'")
-            status['tables_count'] = cursor.fetchone()[0]
+            status['tables_count'] = len(self._get_table_names(cursor))
             
             # Check for issues
             issues = self.validate_schema()
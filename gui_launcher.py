@@ -18,7 +18,6 @@ import webbrowser
 import sys
 import os
 import time
-import shutil
 import json
 from datetime import datetime
 import io
@@ -470,6 +469,7 @@ class AttendanceSystemGUI:
             
             # Check if databases exist
             from config.config import Config
+            from database.connection import backup_database_file
             if not os.path.exists(Config.DATABASE_PATH) and not os.path.exists(Config.CLASSES_DATABASE_PATH):
                 self.backup_status_label.config(text="No databases found to backup", foreground="orange")
                 self.log_message("No databases found to backup", "WARNING")
@@ -488,7 +488,7 @@ class AttendanceSystemGUI:
             if os.path.exists(Config.DATABASE_PATH):
                 filename = os.path.basename(Config.DATABASE_PATH)
                 backup_file = os.path.join(backup_path, filename)
-                shutil.copy2(Config.DATABASE_PATH, backup_file)
+                backup_database_file(Config.DATABASE_PATH, backup_file)
                 backed_up_files.append(filename)
                 total_size += os.path.getsize(backup_file)
             
@@ -496,7 +496,7 @@ class AttendanceSystemGUI:
             if os.path.exists(Config.CLASSES_DATABASE_PATH):
                 filename = os.path.basename(Config.CLASSES_DATABASE_PATH)
                 backup_file = os.path.join(backup_path, filename)
-                shutil.copy2(Config.CLASSES_DATABASE_PATH, backup_file)
+                backup_database_file(Config.CLASSES_DATABASE_PATH, backup_file)
                 backed_up_files.append(filename)
                 total_size += os.path.getsize(backup_file)
             
@@ -660,8 +660,9 @@ class AttendanceSystemGUI:
             self.log_message("Creating backup of current state before restore...")
             self.create_backup()
             
-            # Restore files
+            # Restore files (through SQLite, so a running server's -wal file is not replayed over them)
             from config.config import Config
+            from database.connection import restore_database_file
             backup_path = selected_backup['path']
             restored_files = []
             
@@ -676,7 +677,7 @@ class AttendanceSystemGUI:
                     continue
                 
                 if os.path.exists(source_file):
-                    shutil.copy2(source_file, dest_file)
+                    restore_database_file(source_file, dest_file)
                     restored_files.append(filename)
                     self.log_message(f"✓ Restored: {filename}")
             
@@ -34,7 +34,6 @@ import json
 from database.operations import get_settings, get_db_connection, row_to_dict
 from database.performance_manager import get_optimized_db, db_operation
 from utils.logging_system import get_logger, monitor_performance
-from datetime import datetime
 
 logger = get_logger()
 
@@ -106,21 +105,21 @@ def store_device_fingerprint(fingerprint_hash, device_info):
         
         with db_operation("store_device_fingerprint") as db:
             existing = db.execute_query(
-                'SELECT * FROM device_fingerprints WHERE fingerprint_hash = ?',
+                'SELECT id FROM device_fingerprints WHERE fingerprint_hash = ?',
                 (fingerprint_hash,), fetch='one'
             )
             
-            current_time = datetime.utcnow().isoformat()
-            
             # Convert device_info to JSON string if it's a dict
             device_info_str = json.dumps(device_info) if isinstance(device_info, dict) else device_info
             
+            # Seen times are stamped by SQLite, in UTC
             if existing:
                 db.execute_query('''
                     UPDATE device_fingerprints 
-                    SET last_seen = ?, usage_count = usage_count + 1, device_info = ?, updated_at = ?
+                    SET last_seen = strftime('%Y-%m-%dT%H:%M:%f', 'now'), usage_count = usage_count + 1, device_info = ?,
+                        updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')
                     WHERE fingerprint_hash = ?
-                ''', (current_time, device_info_str, current_time, fingerprint_hash))
+                ''', (device_info_str, fingerprint_hash))
                 device_id = existing[0]  # Get the ID from existing record
                 
                 logger.log_event('debug', "Updated existing device fingerprint",
@@ -129,9 +128,9 @@ def store_device_fingerprint(fingerprint_hash, device_info):
             else:
                 db.execute_query('''
                     INSERT INTO device_fingerprints 
-                    (fingerprint_hash, first_seen, last_seen, usage_count, device_info, created_at, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (fingerprint_hash, current_time, current_time, 1, device_info_str, current_time, current_time))
+                    (fingerprint_hash, first_seen, last_seen, usage_count, device_info, updated_at)
+                    VALUES (?, strftime('%Y-%m-%dT%H:%M:%f', 'now'), strftime('%Y-%m-%dT%H:%M:%f', 'now'), 1, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+                ''', (fingerprint_hash, device_info_str))
                 
                 device_id = db.execute_query("SELECT last_insert_rowid()", fetch='one')[0]
                 
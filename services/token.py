@@ -45,6 +45,7 @@ import random
 import string
 import time
 from config.config import Config
+from database.connection import pooled_connection
 
 def generate_token():
     """Generate random token"""
@@ -67,12 +68,9 @@ def validate_token_access(token_data, device_fingerprint_hash):
         return False, "Token expired"
     # Check device fingerprint consistency (compare hash, not DB id)
     if token_data['opened'] and token_data.get('device_fingerprint_id'):
-        import sqlite3
-        conn = sqlite3.connect(Config.DATABASE_PATH)
-        cursor = conn.cursor()
-        cursor.execute('SELECT fingerprint_hash FROM device_fingerprints WHERE id = ?', (token_data['device_fingerprint_id'],))
-        row = cursor.fetchone()
-        conn.close()
+        with pooled_connection(readonly=True) as conn:
+            row = conn.execute('SELECT fingerprint_hash FROM device_fingerprints WHERE id = ?',
+                               (token_data['device_fingerprint_id'],)).fetchone()
         token_fingerprint_hash = row[0] if row else None
         print(f"[DEBUG] validate_token_access: token_fingerprint_hash={repr(token_fingerprint_hash)}, device_fingerprint_hash={repr(device_fingerprint_hash)}")
         if str(token_fingerprint_hash).strip() != str(device_fingerprint_hash).strip():
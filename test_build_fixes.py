@@ -102,6 +102,10 @@ def test_class_manager():
             print(f"   Initializing manager with test paths...")
             manager = OptimizedClassManager(classes_db, attendance_db)
             
+            # Pooled connections would keep the temp databases open
+            from database.connection import close_all_pools
+            close_all_pools()
+            
             print("✅ OptimizedClassManager initialization working correctly")
             return True
             
@@ -111,6 +115,39 @@ def test_class_manager():
             print(f"   Traceback: {traceback.format_exc()}")
             return False
 
+def test_connection_pragmas():
+    """Test that get_db_connection returns a WAL connection with the tuning pragmas applied"""
+    print("🧪 Testing connection pragmas...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        from config.config import Config
+        from database.connection import get_db_connection, close_thread_connections
+        
+        original_db_path = Config.DATABASE_PATH
+        Config.DATABASE_PATH = os.path.join(temp_dir, 'attendance.db')
+        
+        try:
+            conn = get_db_connection()
+            journal_mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+            mmap_size = conn.execute('PRAGMA mmap_size').fetchone()[0]
+            conn.close()
+            
+            print(f"   journal_mode: {journal_mode}, mmap_size: {mmap_size}")
+            if journal_mode == 'wal' and mmap_size != 0:
+                print("✅ Connection pragmas applied correctly")
+                return True
+            else:
+                print("❌ Connection pragmas missing")
+                return False
+                
+        except Exception as e:
+            print(f"❌ Connection pragma error: {e}")
+            return False
+        finally:
+            # Cached connections would keep the temp database open
+            close_thread_connections()
+            Config.DATABASE_PATH = original_db_path
+
 def test_file_upload_simulation():
     """Simulate a file upload scenario"""
     print("🧪 Testing file upload simulation...")
@@ -174,6 +211,302 @@ def test_file_upload_simulation():
         print(f"   Traceback: {traceback.format_exc()}")
         return False
 
+def test_class_migration_after_analyze():
+    """Test that legacy class migration ignores SQLite's internal tables (sqlite_stat1 from ANALYZE)"""
+    print("🧪 Testing class migration after ANALYZE...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        classes_db = os.path.join(temp_dir, 'classes.db')
+        attendance_db = os.path.join(temp_dir, 'attendance.db')
+        
+        try:
+            import sqlite3
+            from database.models import create_optimized_classes_schema, migrate_existing_classes_data
+            
+            create_optimized_classes_schema(classes_db)
+            
+            # A legacy per-class table, then statistics as PRAGMA optimize / ANALYZE would leave them
+            conn = sqlite3.connect(classes_db)
+            conn.execute('CREATE TABLE Test_Class___Test_Professor (student_id TEXT, name TEXT)')
+            conn.executemany('INSERT INTO Test_Class___Test_Professor VALUES (?, ?)',
+                             [('TEST-001', 'Test Student 1'), ('TEST-002', 'Test Student 2')])
+            conn.commit()
+            conn.execute('ANALYZE')
+            conn.close()
+            
+            migrated = migrate_existing_classes_data(classes_db, attendance_db, drop_old=False)
+            
+            conn = sqlite3.connect(classes_db)
+            enrolled = conn.execute('SELECT COUNT(*) FROM class_enrollments').fetchone()[0]
+            conn.close()
+            
+            from database.connection import close_all_pools
+            close_all_pools()
+            
+            print(f"   migrated: {migrated}, enrollments: {enrolled}")
+            if migrated and enrolled == 2:
+                print("✅ Class migration skips SQLite internal tables")
+                return True
+            else:
+                print("❌ Class migration failed after ANALYZE")
+                return False
+                
+        except Exception as e:
+            print(f"❌ Class migration error: {e}")
+            import traceback
+            print(f"   Traceback: {traceback.format_exc()}")
+            return False
+
+def test_paged_data_with_shared_timestamps():
+    """Test that get_all_data keyset pages return every row when several rows share a timestamp"""
+    print("🧪 Testing paged data with shared timestamps...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        from config.config import Config
+        from database.connection import close_thread_connections, close_all_pools
+        
+        original_db_path = Config.DATABASE_PATH
+        Config.DATABASE_PATH = os.path.join(temp_dir, 'attendance.db')
+        
+        try:
+            from database.models import create_all_tables
+            from database.operations import get_all_data
+            from database.connection import get_db_connection
+            
+            create_all_tables()
+            
+            # Five profiles created in the same second, plus the default profile
+            conn = get_db_connection()
+            conn.executemany('''
+                INSERT INTO session_profiles (profile_name, room_type, building, capacity, organizer, created_at)
+                VALUES (?, 'Classroom', 'Main Building', 30, 'Test Organizer', '2025-01-01 08:00:00')
+            ''', [(f'Profile {i}',) for i in range(5)])
+            conn.commit()
+            expected = conn.execute('SELECT COUNT(*) FROM session_profiles').fetchone()[0]
+            conn.close()
+            
+            seen = []
+            page = get_all_data('session_profiles', limit=2)
+            while page:
+                seen.extend(row['id'] for row in page)
+                page = get_all_data('session_profiles', limit=2, before=page[-1])
+            
+            print(f"   rows: {expected}, paged: {len(seen)}, distinct: {len(set(seen))}")
+            if len(seen) == expected and len(set(seen)) == expected:
+                print("✅ Paging keeps rows that share a timestamp")
+                return True
+            else:
+                print("❌ Paging skipped or repeated rows")
+                return False
+                
+        except Exception as e:
+            print(f"❌ Paged data error: {e}")
+            import traceback
+            print(f"   Traceback: {traceback.format_exc()}")
+            return False
+        finally:
+            # Cached connections would keep the temp database open
+            close_thread_connections()
+            close_all_pools()
+            Config.DATABASE_PATH = original_db_path
+
+def test_student_csv_import():
+    """Test that insert_students_from_csv skips the header and malformed rows and counts the rest"""
+    print("🧪 Testing student CSV import...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        from config.config import Config
+        from database.connection import close_thread_connections, close_all_pools
+        
+        original_db_path = Config.DATABASE_PATH
+        Config.DATABASE_PATH = os.path.join(temp_dir, 'attendance.db')
+        
+        try:
+            from database.models import create_all_tables
+            from database.operations import insert_students_from_csv, get_all_students
+            
+            create_all_tables()
+            
+            # Header, two valid rows, a short row and a row with a non-numeric year
+            csv_path = os.path.join(temp_dir, 'students.csv')
+            with open(csv_path, 'w', newline='', encoding='utf-8') as csv_file:
+                csv_file.write("student_id,name,course,year\n"
+                               "TEST-001,Test Student 1,TEST,1\n"
+                               "TEST-002,Test Student 2,TEST,2\n"
+                               "TEST-003,Missing Columns\n"
+                               "TEST-004,Test Student 4,TEST,fourth\n")
+            
+            count = insert_students_from_csv(csv_path)
+            student_ids = sorted(student['student_id'] for student in get_all_students())
+            
+            print(f"   imported: {count}, students: {student_ids}")
+            if count == 2 and student_ids == ['TEST-001', 'TEST-002']:
+                print("✅ Student CSV import working correctly")
+                return True
+            else:
+                print("❌ Student CSV import imported the wrong rows")
+                return False
+                
+        except Exception as e:
+            print(f"❌ Student CSV import error: {e}")
+            import traceback
+            print(f"   Traceback: {traceback.format_exc()}")
+            return False
+        finally:
+            # Cached connections would keep the temp database open
+            close_thread_connections()
+            close_all_pools()
+            Config.DATABASE_PATH = original_db_path
+
+def test_backup_restore_rolls_back():
+    """Test that restoring a backup really replaces the live (WAL) database contents"""
+    print("🧪 Testing backup restore...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        from config.config import Config
+        from database.connection import close_thread_connections, close_all_pools
+        from utils import logging_system
+        
+        original_db_path = Config.DATABASE_PATH
+        original_classes_db_path = Config.CLASSES_DATABASE_PATH
+        original_project_root = Config.PROJECT_ROOT
+        had_logger = logging_system._logger_instance is not None
+        Config.DATABASE_PATH = os.path.join(temp_dir, 'attendance.db')
+        Config.CLASSES_DATABASE_PATH = os.path.join(temp_dir, 'classes.db')
+        Config.PROJECT_ROOT = temp_dir
+        
+        try:
+            import sqlite3
+            from database.models import create_all_tables
+            from database.connection import get_db_connection, pooled_connection
+            from utils.system_monitor import BackupManager
+            
+            create_all_tables()
+            
+            def add_student(student_id):
+                conn = get_db_connection()
+                conn.execute("INSERT INTO students (student_id, name, course, year) VALUES (?, 'Test', 'TEST', 1)",
+                             (student_id,))
+                conn.commit()
+                conn.close()
+            
+            def student_ids(conn):
+                return [row[0] for row in conn.execute('SELECT student_id FROM students ORDER BY student_id')]
+            
+            # Back up with only S1, add S2 while this thread's connection keeps the WAL open, then restore
+            add_student('S1')
+            manager = BackupManager()
+            backup = manager.create_backup()
+            add_student('S2')
+            with pooled_connection(readonly=True) as reader:
+                student_ids(reader)
+            result = manager.restore_backup(backup['backup_name'])
+            
+            conn = get_db_connection()
+            cached_ids = student_ids(conn)
+            conn.close()
+            fresh = sqlite3.connect(Config.DATABASE_PATH)
+            fresh_ids = student_ids(fresh)
+            fresh.close()
+            # The reader pool was closed by the restore and reopens on demand
+            with pooled_connection(readonly=True) as new_reader:
+                pooled_ids = student_ids(new_reader)
+            
+            print(f"   restored: {result.get('success')}, cached: {cached_ids}, fresh: {fresh_ids}, "
+                  f"pooled: {pooled_ids}, pool reopened: {new_reader is not reader}")
+            if (result.get('success') and cached_ids == ['S1'] and fresh_ids == ['S1']
+                    and pooled_ids == ['S1'] and new_reader is not reader):
+                print("✅ Backup restore rolled the data back")
+                return True
+            else:
+                print("❌ Backup restore left newer data in place")
+                return False
+                
+        except Exception as e:
+            print(f"❌ Backup restore error: {e}")
+            import traceback
+            print(f"   Traceback: {traceback.format_exc()}")
+            return False
+        finally:
+            # Cached connections and a logger opened here would keep temp files open
+            close_thread_connections()
+            close_all_pools()
+            if not had_logger and logging_system._logger_instance is not None:
+                for handler in logging_system._logger_instance.logger.handlers[:]:
+                    handler.close()
+                logging_system._logger_instance = None
+            Config.DATABASE_PATH = original_db_path
+            Config.CLASSES_DATABASE_PATH = original_classes_db_path
+            Config.PROJECT_ROOT = original_project_root
+
+def test_nested_connection_checkouts():
+    """Test that a helper's commit, rollback and close on a nested get_db_connection() only affect its own writes"""
+    print("🧪 Testing nested connection checkouts...")
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        from config.config import Config
+        from database.connection import close_thread_connections, close_all_pools
+        
+        original_db_path = Config.DATABASE_PATH
+        Config.DATABASE_PATH = os.path.join(temp_dir, 'attendance.db')
+        
+        try:
+            import sqlite3
+            from database.models import create_all_tables
+            from database.connection import get_db_connection
+            
+            create_all_tables()
+            insert_sql = "INSERT INTO students (student_id, name, course, year) VALUES (?, 'Test', 'TEST', 1)"
+            
+            def helper(student_id, fail=False):
+                conn = get_db_connection()
+                conn.execute(insert_sql, (student_id,))
+                if fail:
+                    conn.rollback()
+                else:
+                    conn.commit()
+                conn.close()
+                conn.close()  # an extra close must not end the caller's checkout
+            
+            # Committed caller: its own row plus the helper that committed, not the one that rolled back
+            outer = get_db_connection()
+            outer.execute(insert_sql, ('S1',))
+            helper('S2')
+            helper('S3', fail=True)
+            still_open = outer.in_transaction
+            outer.commit()
+            outer.close()
+            
+            # Rolled-back caller: a helper's commit must not have committed the caller's writes
+            outer = get_db_connection()
+            outer.execute(insert_sql, ('S4',))
+            helper('S5')
+            outer.rollback()
+            outer.close()
+            
+            fresh = sqlite3.connect(Config.DATABASE_PATH)
+            student_ids = [row[0] for row in fresh.execute('SELECT student_id FROM students ORDER BY student_id')]
+            fresh.close()
+            
+            print(f"   caller transaction kept: {still_open}, students: {student_ids}")
+            if still_open and student_ids == ['S1', 'S2']:
+                print("✅ Nested checkouts are scoped to their own writes")
+                return True
+            else:
+                print("❌ Nested checkouts leaked into the caller's transaction")
+                return False
+                
+        except Exception as e:
+            print(f"❌ Nested checkout error: {e}")
+            import traceback
+            print(f"   Traceback: {traceback.format_exc()}")
+            return False
+        finally:
+            # Cached connections would keep the temp database open
+            close_thread_connections()
+            close_all_pools()
+            Config.DATABASE_PATH = original_db_path
+
 def run_all_tests():
     """Run all tests"""
     print("🔬 Running Build Verification Tests")
@@ -183,7 +516,13 @@ def run_all_tests():
         ("Path Resolution", test_path_resolution),
         ("Database Creation", test_database_creation),
         ("Class Manager", test_class_manager),
+        ("Connection Pragmas", test_connection_pragmas),
         ("File Upload Simulation", test_file_upload_simulation),
+        ("Class Migration After ANALYZE", test_class_migration_after_analyze),
+        ("Paged Data With Shared Timestamps", test_paged_data_with_shared_timestamps),
+        ("Student CSV Import", test_student_csv_import),
+        ("Backup Restore", test_backup_restore_rolls_back),
+        ("Nested Connection Checkouts", test_nested_connection_checkouts),
     ]
     
     results = []
@@ -1,18 +1,16 @@
-import sqlite3
 import os
 from config.config import Config
+from database.connection import get_db_connection as _get_tuned_connection
 
 # Database path
 DB_PATH = Config.DATABASE_PATH
 
 def get_db_connection():
-    """Get database connection to existing database"""
+    """Get database connection to existing database (same tuned connection as database.connection)"""
     if not os.path.exists(DB_PATH):
         raise FileNotFoundError(f"Database not found at {DB_PATH}")
     
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return _get_tuned_connection()
 
 def migrate_database():
     """Add missing columns to existing tables if needed"""
@@ -26,12 +24,16 @@ def migrate_database():
         ('active_tokens', 'device_signature', 'TEXT')
     ]
     
+    # Column names per table, read once per table rather than once per migration
+    existing = {}
     for table, column, datatype in migrations:
         try:
-            cursor.execute(f"PRAGMA table_info({table})")
-            columns = [col[1] for col in cursor.fetchall()]
-            if column not in columns:
+            if table not in existing:
+                cursor.execute(f"PRAGMA table_info({table})")
+                existing[table] = {col[1] for col in cursor.fetchall()}
+            if column not in existing[table]:
                 cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {datatype}')
+                existing[table].add(column)
         except Exception as e:
             print(f"Migration error: {e}")
     
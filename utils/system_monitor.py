@@ -25,6 +25,9 @@ from typing import Dict, List, Any, Optional, Callable
 from dataclasses import dataclass, asdict
 from enum import Enum
 from config.config import Config
+from database.connection import (
+    backup_database_file, restore_database_file, close_thread_connections, close_all_pools
+)
 from utils.logging_system import get_logger, monitor_performance
 
 class SystemStatus(Enum):
@@ -471,6 +474,12 @@ class BackupManager:
         try:
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             backup_name = f"backup_{timestamp}"
+            # A second backup within the same second (e.g. restore's pre-restore backup)
+            # must not overwrite the first one
+            suffix = 1
+            while os.path.exists(os.path.join(self.backup_dir, backup_name)):
+                backup_name = f"backup_{timestamp}_{suffix}"
+                suffix += 1
             backup_path = os.path.join(self.backup_dir, backup_name)
             
             os.makedirs(backup_path, exist_ok=True)
@@ -489,7 +498,9 @@ class BackupManager:
                 
                 if os.path.exists(src_path):
                     dst_path = os.path.join(backup_path, dst_name)
-                    shutil.copy2(src_path, dst_path)
+                    # Online backup API: consistent while the app is running and includes
+                    # pages still in the -wal file, which a plain file copy would miss
+                    backup_database_file(src_path, dst_path)
                     copied_size += os.path.getsize(src_path)
             
             # Create backup metadata
@@ -581,6 +592,11 @@ class BackupManager:
             # Create current backup before restore
             current_backup = self.create_backup()
             
+            # Close the cached per-thread connections and every idle pooled connection
+            # (both databases, readers and writer); they reopen lazily on next use
+            close_thread_connections()
+            close_all_pools()
+            
             # Restore files
             file_mapping = {
                 'attendance.db': Config.DATABASE_PATH,
@@ -597,7 +613,9 @@ class BackupManager:
                 if dst_path and os.path.exists(src_path):
                     # Ensure directory exists
                     os.makedirs(os.path.dirname(dst_path), exist_ok=True)
-                    shutil.copy2(src_path, dst_path)
+                    # Write through SQLite rather than copying over the live file, which would
+                    # leave the old -wal file to be replayed on top of the restored database
+                    restore_database_file(src_path, dst_path)
             
             if progress_callback:
                 progress_callback(len(files_to_restore), len(files_to_restore), "Restore completed")